@@ -3,6 +3,7 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy.stats import kruskal
 import scikit_posthocs as sp
+from letter_display import compact_letter_display, label_with_letters
 
 # Step 1: Load and clean data
 df = pd.read_csv("Ischnura_2000-2024.csv", low_memory=False)
@@ -25,9 +26,16 @@ else:
 # Step 3: Dunn’s test for pairwise comparisons (Bonferroni corrected)
 posthoc = sp.posthoc_dunn(df_clean, val_col='Parasite', group_col='Age', p_adjust='bonferroni')
 
+# Compact letter display: age groups sharing a letter do not differ significantly
+letters = compact_letter_display(posthoc, alpha=0.05)
+print("Compact letter display (Dunn, Bonferroni):")
+print(letters)
+
 # Step 4: Heatmap of Dunn’s test p-values
 plt.figure(figsize=(10, 8))
-sns.heatmap(posthoc, annot=True, fmt=".3f", cmap='coolwarm', cbar_kws={'label': 'p-value'})
+tick_labels = label_with_letters(posthoc.index, letters)
+sns.heatmap(posthoc, annot=True, fmt=".3f", cmap='coolwarm', cbar_kws={'label': 'p-value'},
+            xticklabels=tick_labels, yticklabels=tick_labels)
 plt.title("Dunn's Test: Pairwise Comparison of Parasite Load Across Age Groups")
 plt.tight_layout()
 plt.show()
\ No newline at end of file
@@ -0,0 +1,434 @@
+import asyncio
+import io
+import json
+import math
+import multiprocessing
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from scipy.stats import t as t_dist, mannwhitneyu, kruskal, pearsonr
+import scikit_posthocs as sp
+
+from field_data import FILE_PATH, load_field_data
+from shared_dataset import SharedDataset, dataset_pool, submit_with_dataset
+from thorax_contingency import build_thorax_counts, homogeneity_tests, normalise_counts
+
+# --- Configuration ---
+HOST = '127.0.0.1'
+PORT = 8765
+CACHE_SIZE = 256            # Responses kept in the LRU cache
+MAX_WORKERS = 4             # Worker processes for rank tests and PNG rendering
+# Columns the rank tests read from the shared-memory dataset
+SHARED_CODED_COLUMNS = {'Locale': np.int16, 'Morph': np.int16}
+SHARED_NUMERIC_COLUMNS = {'Copula': np.int8, 'Year': np.int16, 'Parasite': np.float64}
+
+
+class LRUCache:
+    """Small least-recently-used cache for finished responses."""
+
+    def __init__(self, max_size: int = CACHE_SIZE):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key in self._items:
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+
+# --- Aggregates built once at start-up; the mean endpoints are served from these tables ---
+
+def _sums(df: pd.DataFrame, keys: list, columns: dict) -> pd.DataFrame:
+    """Row count 'n' and the sums {name: (column, power)} per key cell; rows with a missing Locale are kept."""
+    parts = pd.DataFrame({name: df[col] ** power for name, (col, power) in columns.items()}, index=df.index)
+    parts.insert(0, 'n', 1)
+    return parts.join(df[keys]).groupby(keys, dropna=False).sum()
+
+
+def build_aggregates(df: pd.DataFrame) -> dict:
+    """
+    Per-(Locale, Year, Sex/Copula) sums of Parasite, per-(Locale, Year) sums of Parasite and
+    Length for the lagged analysis, and the thorax colour count tensors.
+    """
+    dated = df.dropna(subset=['Parasite', 'Year'])
+    moments = {'sum': ('Parasite', 1), 'sumsq': ('Parasite', 2)}
+    lagged_rows = df.dropna(subset=['Year', 'Parasite', 'Length'])
+    return {
+        'Sex': _sums(dated[dated['Sex'].isin([0, 1])], ['Locale', 'Year', 'Sex'], moments),
+        'Copula': _sums(dated[dated['Copula'].isin([0, 1])], ['Locale', 'Year', 'Copula'], moments),
+        'lagged': _sums(lagged_rows, ['Locale', 'Year'], {'parasite': ('Parasite', 1), 'length': ('Length', 1)}),
+        'thorax': build_thorax_counts(df),
+    }
+
+
+def select_cells(table: pd.DataFrame, params: dict) -> pd.DataFrame:
+    """Applies the locale and year-range query parameters to an aggregate table."""
+    locale = table.index.get_level_values('Locale')
+    year = table.index.get_level_values('Year')
+    mask = np.ones(len(table), dtype=bool)
+    if params.get('locale'):
+        mask &= locale == params['locale']
+    if params.get('year_from'):
+        mask &= year >= int(params['year_from'])
+    if params.get('year_to'):
+        mask &= year <= int(params['year_to'])
+    return table[mask]
+
+
+def welch_from_sums(n1, s1, ss1, n0, s0, ss0) -> float:
+    """Welch's t-test p-value (as ttest_ind(group1, group0, equal_var=False)) from counts and sums."""
+    m1, m0 = s1 / n1, s0 / n0
+    v1, v0 = (ss1 - s1 * m1) / (n1 - 1) / n1, (ss0 - s0 * m0) / (n0 - 1) / n0
+    if v1 + v0 <= 0:
+        return None
+    t_stat = (m1 - m0) / np.sqrt(v1 + v0)
+    dof = (v1 + v0) ** 2 / (v1 ** 2 / (n1 - 1) + v0 ** 2 / (n0 - 1))
+    return 2 * t_dist.sf(abs(t_stat), dof)
+
+
+def _yearly_means(aggregates: dict, group_col: str, labels: dict, params: dict):
+    cells = select_cells(aggregates[group_col], params)
+    by_year = cells.groupby(['Year', group_col])[['n', 'sum']].sum()
+    means = (by_year['sum'] / by_year['n']).unstack(group_col).rename(columns=labels)
+    means.index = means.index.astype(int)
+    totals = cells.groupby(group_col)[['n', 'sum', 'sumsq']].sum().reindex([0, 1], fill_value=0)
+    return means, totals
+
+
+def _means_result(test: str, p_value, labels: dict, means: pd.DataFrame, totals: pd.DataFrame) -> dict:
+    return {
+        'test': test,
+        'p_value': p_value,
+        'n': {labels[0]: int(totals.loc[0, 'n']), labels[1]: int(totals.loc[1, 'n'])},
+        'yearly_means': {str(year): row.to_dict() for year, row in means.iterrows()},
+    }
+
+
+SEX_LABELS = {1: 'Males (1)', 0: 'Females (0)'}
+COPULA_LABELS = {0: 'Copula = 0', 1: 'Copula = 1'}
+
+
+def analyse_sex_means(aggregates: dict, params: dict) -> dict:
+    means, totals = _yearly_means(aggregates, 'Sex', SEX_LABELS, params)
+    p_value = None
+    if (totals['n'] >= 2).all():
+        p_value = welch_from_sums(*totals.loc[1, ['n', 'sum', 'sumsq']], *totals.loc[0, ['n', 'sum', 'sumsq']])
+    return _means_result('Welch t-test', p_value, SEX_LABELS, means, totals)
+
+
+def analyse_lagged(aggregates: dict, params: dict) -> dict:
+    cells = select_cells(aggregates['lagged'], params).groupby('Year').sum()
+    cells.index = cells.index.astype(int)
+    lagged = pd.concat([(cells['parasite'] / cells['n']).rename('Parasite_X'),
+                        (cells['length'] / cells['n']).shift(-1).rename('Length_X_plus_1')], axis=1).dropna()
+    r, p_value = pearsonr(lagged['Parasite_X'], lagged['Length_X_plus_1']) if len(lagged) >= 2 else (None, None)
+    return {
+        'pearson_r': r,
+        'p_value': p_value,
+        'lagged_means': {str(year): row.to_dict() for year, row in lagged.iterrows()},
+    }
+
+
+def analyse_thorax(aggregates: dict, params: dict) -> dict:
+    counts = aggregates['thorax']
+    locale_mask = np.ones(len(counts['locales']), dtype=bool)
+    if params.get('locale'):
+        locale_mask = counts['locales'] == params['locale']
+    year_mask = np.ones(len(counts['years']), dtype=bool)
+    if params.get('year_from'):
+        year_mask &= counts['years'] >= int(params['year_from'])
+    if params.get('year_to'):
+        year_mask &= counts['years'] <= int(params['year_to'])
+    tensor = counts['locale_year_color'][locale_mask][:, year_mask]
+    totals = tensor.sum(axis=(0, 1))
+    if totals.sum() == 0:
+        return {'error': "No valid thorax colour data"}
+    per_locale = homogeneity_tests(tensor)
+    per_locale.insert(0, 'Locale', counts['locales'][locale_mask])
+    # Locales without thorax records in the selected years are left out, as if the rows had been filtered first
+    per_locale = per_locale[per_locale['n'] > 0]
+    probs = pd.Series(normalise_counts(totals), index=counts['colors'])
+    return {
+        'probabilities': probs[probs > 0].round(3).to_dict(),
+        'n': int(totals.sum()),
+        'per_locale_tests': per_locale.to_dict(orient='records'),
+    }
+
+
+# --- Rank tests need the raw rows: they run in worker processes attached to the shared dataset ---
+
+def _row_mask(dataset: SharedDataset, params: dict) -> np.ndarray:
+    mask = np.ones(len(dataset), dtype=bool)
+    if params.get('locale'):
+        categories = dataset.categories['Locale']
+        code = categories.index(params['locale']) if params['locale'] in categories else -2
+        mask &= dataset['Locale'] == code
+    if params.get('year_from'):
+        mask &= dataset['Year'] >= int(params['year_from'])
+    if params.get('year_to'):
+        mask &= dataset['Year'] <= int(params['year_to'])
+    return mask
+
+
+def copula_test(dataset: SharedDataset, params: dict):
+    """Mann-Whitney U of Parasite between Copula = 0 and 1 (the yearly means come from the aggregates)."""
+    parasite, copula = dataset['Parasite'], dataset['Copula']
+    mask = _row_mask(dataset, params) & ~np.isnan(parasite) & (dataset['Year'] >= 0)
+    group0, group1 = parasite[mask & (copula == 0)], parasite[mask & (copula == 1)]
+    if len(group0) < 5 or len(group1) < 5:
+        return None
+    return mannwhitneyu(group0, group1, alternative='two-sided').pvalue
+
+
+def morph_tests(dataset: SharedDataset, params: dict) -> dict:
+    """Kruskal-Wallis and Dunn's test of Parasite (> 0) across morphs."""
+    parasite, morph = dataset['Parasite'], dataset['Morph']
+    mask = _row_mask(dataset, params) & (parasite > 0) & (morph >= 0)
+    df = pd.DataFrame({'Morph': dataset.decode('Morph', morph[mask]), 'Parasite': parasite[mask]})
+    groups = [group['Parasite'] for _, group in df.groupby('Morph')]
+    if len(groups) < 2:
+        return {'error': "Need at least two morphs with data"}
+    stat, p_kruskal = kruskal(*groups)
+    posthoc = sp.posthoc_dunn(df, val_col='Parasite', group_col='Morph', p_adjust='bonferroni')
+    return {
+        'kruskal_H': stat,
+        'kruskal_p': p_kruskal,
+        'medians': df.groupby('Morph')['Parasite'].median().to_dict(),
+        'dunn_p': {row: posthoc.loc[row].to_dict() for row in posthoc.index},
+    }
+
+
+# --- Figures are rendered from the results alone, in the worker processes ---
+
+def _render_means(fig: Figure, result: dict, title: str):
+    means = pd.DataFrame.from_dict(result['yearly_means'], orient='index')
+    means.index = means.index.astype(int)
+    ax = fig.subplots()
+    for column, style in zip(means.columns, ['o-', 's--']):
+        ax.plot(means.index, means[column], style, label=column)
+    p_text = "N/A" if result['p_value'] is None else f"{result['p_value']:.3f}"
+    ax.set_title(f"{title}\n{result['test']} p-value: {p_text}")
+    ax.set_xlabel("Year")
+    ax.set_ylabel("Mean Parasite Count")
+    ax.grid(True, linestyle='--', alpha=0.7)
+    if len(means.columns):
+        ax.legend()
+
+
+def render_sex_means(fig: Figure, result: dict, params: dict):
+    _render_means(fig, result, "Mean Parasite Count by Gender Over Years")
+
+
+def render_copula_means(fig: Figure, result: dict, params: dict):
+    _render_means(fig, result, "Mean Parasite Count by Copula Status Over Years")
+
+
+def render_morph(fig: Figure, result: dict, params: dict):
+    posthoc = pd.DataFrame.from_dict(result['dunn_p'], orient='index')
+    ax = fig.subplots()
+    image = ax.imshow(posthoc.to_numpy(dtype=float), cmap='coolwarm', vmin=0, vmax=1)
+    ax.set_xticks(range(len(posthoc)), posthoc.columns, rotation=45, ha='right')
+    ax.set_yticks(range(len(posthoc)), posthoc.index)
+    for (i, j), value in np.ndenumerate(posthoc.to_numpy(dtype=float)):
+        ax.text(j, i, f"{value:.3f}", ha='center', va='center', fontsize=8)
+    fig.colorbar(image, ax=ax, label='p-value')
+    ax.set_title(f"Dunn's Test by Morph (Kruskal-Wallis p = {result['kruskal_p']:.3e})")
+
+
+def render_thorax(fig: Figure, result: dict, params: dict):
+    plot_data = pd.Series(result['probabilities'])
+    ax = fig.subplots()
+    bars = ax.bar(plot_data.index, plot_data.values, color='deepskyblue')
+    for bar in bars:
+        ax.text(bar.get_x() + bar.get_width() / 2, bar.get_height() + 0.005, f"{bar.get_height():.3f}", ha='center', va='bottom', fontsize=9)
+    ax.set_xlabel("Thorax Color (lowercase standardized)")
+    ax.set_ylabel("Probability")
+    ax.set_title(f"Thorax Color Probabilities in Locale: {params.get('locale') or 'All'}")
+    ax.tick_params(axis='x', rotation=45)
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+
+
+def render_lagged(fig: Figure, result: dict, params: dict):
+    lagged = pd.DataFrame.from_dict(result['lagged_means'], orient='index', columns=['Parasite_X', 'Length_X_plus_1'])
+    lagged.index = lagged.index.astype(int)
+    ax1 = fig.subplots()
+    ax1.plot(lagged.index, lagged['Parasite_X'], 'o-', color='mediumseagreen')
+    ax1.set_xlabel("Year (X)")
+    ax1.set_ylabel("Mean Parasite Count (Year X)", color='mediumseagreen')
+    ax2 = ax1.twinx()
+    ax2.plot(lagged.index, lagged['Length_X_plus_1'], 's--', color='tomato')
+    ax2.set_ylabel("Mean Body Length (Year X+1)", color='tomato')
+    r_text = "N/A" if result['pearson_r'] is None else f"{result['pearson_r']:.2f}, p-value: {result['p_value']:.3f}"
+    ax1.set_title(f"Lagged Analysis: Parasites & Body Length\nPearson r: {r_text}")
+    ax1.grid(True, linestyle=':', alpha=0.7)
+
+
+def render_png(path: str, result: dict, params: dict) -> bytes:
+    fig = Figure(figsize=(11, 6))
+    RENDERERS[path](fig, result, params)
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=100)
+    return buffer.getvalue()
+
+
+ENDPOINTS = ['/sex-means', '/copula-means', '/morph-kruskal', '/thorax', '/lagged']
+RENDERERS = {
+    '/sex-means': render_sex_means,
+    '/copula-means': render_copula_means,
+    '/morph-kruskal': render_morph,
+    '/thorax': render_thorax,
+    '/lagged': render_lagged,
+}
+
+
+def _jsonable(value):
+    """Replaces NaN/inf with None and NumPy scalars with Python ones so json.dumps accepts the result."""
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+class AnalysisService:
+    """
+    asyncio HTTP server over aggregates built once at start-up. Mean endpoints are answered
+    from those tables on the event loop; rank tests and PNG rendering run in a process pool
+    whose workers attach to the shared-memory dataset. Finished responses are kept in an
+    LRU cache, and identical requests arriving while one is being computed share its result.
+    """
+
+    def __init__(self, df: pd.DataFrame, cache_size: int = CACHE_SIZE, max_workers: int = MAX_WORKERS):
+        self.aggregates = build_aggregates(df)
+        self.dataset = SharedDataset.publish(df, coded_columns=SHARED_CODED_COLUMNS, numeric_columns=SHARED_NUMERIC_COLUMNS)
+        self.pool = dataset_pool(self.dataset, max_workers, multiprocessing.get_context('spawn'))
+        self.cache = LRUCache(cache_size)
+        self._in_flight = {}
+
+    async def _in_pool(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, func, *args)
+
+    async def _with_dataset(self, func, params: dict):
+        return await asyncio.wrap_future(submit_with_dataset(self.pool, func, params))
+
+    async def analyse(self, path: str, params: dict) -> dict:
+        if path == '/sex-means':
+            return analyse_sex_means(self.aggregates, params)
+        if path == '/copula-means':
+            means, totals = _yearly_means(self.aggregates, 'Copula', COPULA_LABELS, params)
+            p_value = await self._with_dataset(copula_test, params)
+            return _means_result('Mann-Whitney U', p_value, COPULA_LABELS, means, totals)
+        if path == '/morph-kruskal':
+            return await self._with_dataset(morph_tests, params)
+        if path == '/thorax':
+            return analyse_thorax(self.aggregates, params)
+        return analyse_lagged(self.aggregates, params)
+
+    async def compute(self, path: str, params: dict, fmt: str):
+        result = await self.analyse(path, params)
+        if 'error' in result:
+            # The analysis cannot run on this selection; same status whichever format was asked for
+            return 422, 'application/json', json.dumps(_jsonable(result)).encode()
+        if fmt == 'png':
+            return 200, 'image/png', await self._in_pool(render_png, path, result, params)
+        return 200, 'application/json', json.dumps(_jsonable(result)).encode()
+
+    async def respond(self, target: str):
+        parts = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        fmt = query.pop('format', 'json')
+        if parts.path == '/':
+            body = json.dumps({'endpoints': ENDPOINTS, 'parameters': ['locale', 'year_from', 'year_to', 'format=json|png'],
+                               'cache': {'hits': self.cache.hits, 'misses': self.cache.misses}}).encode()
+            return 200, 'application/json', body
+        if parts.path not in ENDPOINTS:
+            return 404, 'application/json', json.dumps({'error': f"Unknown endpoint '{parts.path}'"}).encode()
+        for key in ('year_from', 'year_to'):
+            if key in query and not query[key].lstrip('-').isdigit():
+                return 400, 'application/json', json.dumps({'error': f"'{key}' must be a year"}).encode()
+
+        key = (parts.path, fmt, tuple(sorted(query.items())))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        if key not in self._in_flight:
+            self._in_flight[key] = asyncio.ensure_future(self.compute(parts.path, query, fmt))
+        future = self._in_flight[key]
+        try:
+            response = await asyncio.shield(future)
+        except Exception as e:
+            return 500, 'application/json', json.dumps({'error': str(e)}).encode()
+        finally:
+            self._in_flight.pop(key, None)
+        self.cache.put(key, response)
+        return response
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            if len(request_line) < 2 or request_line[0] != 'GET':
+                status, content_type, body = 405, 'application/json', b'{"error": "Only GET is supported"}'
+            else:
+                status, content_type, body = await self.respond(request_line[1])
+            reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                      422: 'Unprocessable Entity', 500: 'Internal Server Error'}[status]
+            writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        self.pool.shutdown()
+        self.dataset.close()
+
+    async def serve(self, host: str = HOST, port: int = PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Serving {', '.join(ENDPOINTS)} on http://{host}:{port}/")
+        async with server:
+            await server.serve_forever()
+
+
+# --- Main script execution ---
+if __name__ == "__main__":
+    try:
+        start_time = time.perf_counter()
+        df_main = load_field_data(FILE_PATH)
+        print(f"Successfully loaded data from: {FILE_PATH} in {time.perf_counter() - start_time:.1f} s")
+    except FileNotFoundError:
+        print(f"CRITICAL ERROR: The file '{FILE_PATH}' was not found.")
+        exit()
+
+    start_time = time.perf_counter()
+    service = AnalysisService(df_main)
+    print(f"Built aggregates and published the shared dataset in {time.perf_counter() - start_time:.1f} s")
+    try:
+        asyncio.run(service.serve())
+    except KeyboardInterrupt:
+        print("\n--- Service stopped ---")
+    finally:
+        service.close()
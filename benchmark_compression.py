@@ -0,0 +1,65 @@
+import bz2
+import gzip
+import lzma
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from field_data import FILE_PATH, read_field_csv
+
+# --- Configuration ---
+CODECS = ['gzip', 'xz', 'bz2', 'zstd']
+EXTENSIONS = {'gzip': '.gz', 'xz': '.xz', 'bz2': '.bz2', 'zstd': '.zst'}
+REPEATS = 3
+
+
+def compress_file(src: str, dst: str, codec: str):
+    if codec == 'zstd':
+        import zstandard
+        with open(src, 'rb') as f_in, open(dst, 'wb') as f_out:
+            zstandard.ZstdCompressor(level=3).copy_stream(f_in, f_out)
+        return
+    opener = {'gzip': gzip.open, 'xz': lzma.open, 'bz2': bz2.open}[codec]
+    with open(src, 'rb') as f_in, opener(dst, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+
+
+def best_time(func) -> float:
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+# --- Main script execution ---
+if __name__ == "__main__":
+    if not os.path.exists(FILE_PATH):
+        print(f"CRITICAL ERROR: The file '{FILE_PATH}' was not found.")
+        exit()
+
+    raw_mb = os.path.getsize(FILE_PATH) / 1e6
+    plain = best_time(lambda: pd.read_csv(FILE_PATH, sep=',', low_memory=False))
+    print(f"Input: {FILE_PATH} ({raw_mb:.1f} MB), best of {REPEATS} runs")
+    print(f"\n{'codec':<6} {'size MB':>8} {'ratio':>6} {'pandas s':>9} {'threaded s':>11} {'MB/s':>7}")
+    print(f"{'plain':<6} {raw_mb:>8.1f} {1:>6.1f} {plain:>9.2f} {'-':>11} {raw_mb / plain:>7.1f}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for codec in CODECS:
+            path = os.path.join(tmp_dir, os.path.basename(FILE_PATH) + EXTENSIONS[codec])
+            try:
+                compress_file(FILE_PATH, path, codec)
+            except ImportError:
+                print(f"{codec:<6} skipped (package not installed)")
+                continue
+            size_mb = os.path.getsize(path) / 1e6
+            # pandas decompresses inline on the parsing thread
+            inline = best_time(lambda: pd.read_csv(path, sep=',', low_memory=False))
+            threaded = best_time(lambda: read_field_csv(path))
+            print(f"{codec:<6} {size_mb:>8.1f} {raw_mb / size_mb:>6.1f} {inline:>9.2f} {threaded:>11.2f} {raw_mb / threaded:>7.1f}")
+
+    print("\nMB/s is uncompressed CSV throughput. On I/O-bound shared storage the bytes read drop by the ratio column.")
@@ -0,0 +1,61 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from field_data import FILE_PATH, load_field_data
+from shared_dataset import SharedDataset, run_in_pool, mean_parasite_by_year
+
+# --- Configuration ---
+N_TASKS = 64
+MAX_WORKERS = 4
+
+
+def pickled_task(args) -> pd.Series:
+    """The same per-locale computation, but the whole DataFrame travels with every task."""
+    df, locale = args
+    subset = df[(df['Locale'] == locale) & (df['Parasite'] > 0)].dropna(subset=['Year'])
+    return subset.groupby('Year')['Parasite'].mean().rename(locale)
+
+
+def bench_pickle(df: pd.DataFrame, locales) -> float:
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        list(pool.map(pickled_task, [(df, locale) for locale in locales]))
+    return time.perf_counter() - start
+
+
+def bench_shared(df: pd.DataFrame, locales) -> float:
+    start = time.perf_counter()
+    with SharedDataset.publish(df) as shared:
+        run_in_pool(mean_parasite_by_year, locales, shared, max_workers=MAX_WORKERS)
+    return time.perf_counter() - start
+
+
+# --- Main script execution ---
+if __name__ == "__main__":
+    try:
+        df_main = load_field_data(FILE_PATH)
+        print(f"Successfully loaded data from: {FILE_PATH} ({len(df_main)} rows)")
+    except FileNotFoundError:
+        print(f"CRITICAL ERROR: The file '{FILE_PATH}' was not found.")
+        exit()
+
+    df_main = df_main.dropna(subset=['Locale'])
+    all_locales = sorted(df_main['Locale'].unique())
+    locales = [all_locales[i % len(all_locales)] for i in range(N_TASKS)]
+
+    pickle_time = bench_pickle(df_main, locales)
+    shared_time = bench_shared(df_main, locales)
+
+    print(f"\n--- {N_TASKS} tasks on {MAX_WORKERS} workers ---")
+    print(f"Pickled DataFrame per task: {pickle_time:.2f} s")
+    print(f"Shared-memory handle:       {shared_time:.2f} s (includes publishing)")
+    print(f"Speed-up: {pickle_time / shared_time:.1f}x")
+
+    # Sanity check: both paths give the same yearly means
+    pickled_result = pickled_task((df_main, all_locales[0]))
+    with SharedDataset.publish(df_main) as shared:
+        zero_copy_result = mean_parasite_by_year(shared, all_locales[0])
+    print(f"Results agree: {np.allclose(pickled_result.to_numpy(), zero_copy_result.to_numpy())}")
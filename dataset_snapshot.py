@@ -0,0 +1,150 @@
+import json
+import os
+import struct
+import time
+
+import numpy as np
+import pandas as pd
+
+from field_data import FILE_PATH, load_field_data
+from shared_dataset import encode_dataset, frame_column
+
+# --- Configuration ---
+SNAPSHOT_PATH = "Ischnura_2000-2024.snap"
+SNAPSHOT_MAGIC = b'ISNP'
+SNAPSHOT_VERSION = 1
+ALIGNMENT = 64              # Column offsets are aligned so every column maps cleanly
+
+# Columns kept in the snapshot; -1 marks a missing code or integer, NaT a missing date
+CODED_COLUMNS = {'Locale': np.int16, 'Morph': np.int16, 'Thor.col': np.int16, 'Age': np.int16}
+NUMERIC_COLUMNS = {'Sex': np.int8, 'Copula': np.int8, 'Year': np.int16, 'Parasite': np.float64, 'Length': np.float64}
+DATE_COLUMNS = {'Datum': 'datetime64[D]'}
+
+# magic, version, header length
+_PREAMBLE = struct.Struct('<4sIQ')
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_snapshot(df_input: pd.DataFrame, path: str = SNAPSHOT_PATH, source: str = FILE_PATH):
+    """
+    Writes the cleaned dataset as fixed-width columns behind a small JSON header.
+    The file is written to a temporary name and renamed, so readers never see half a snapshot.
+    """
+    present = set(df_input.columns)
+    coded = {name: dtype for name, dtype in CODED_COLUMNS.items() if name in present}
+    numeric = {name: dtype for name, dtype in NUMERIC_COLUMNS.items() if name in present}
+    arrays, categories = encode_dataset(df_input, coded, numeric)
+    for name, dtype in DATE_COLUMNS.items():
+        if name in present:
+            arrays[name] = pd.to_datetime(df_input[name], errors='coerce').to_numpy().astype(dtype)
+
+    columns = []
+    offset = 0
+    for name, values in arrays.items():
+        columns.append({'name': name, 'dtype': values.dtype.str, 'offset': offset})
+        offset = _aligned(offset + values.nbytes)
+    header = json.dumps({
+        'length': len(df_input),
+        'columns': columns,
+        'categories': categories,
+        'source': source,
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }).encode()
+    data_start = _aligned(_PREAMBLE.size + len(header))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREAMBLE.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header)))
+        f.write(header)
+        for column in columns:
+            f.seek(data_start + column['offset'])
+            f.write(np.ascontiguousarray(arrays[column['name']]).tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+
+class Snapshot:
+    """
+    Read-only view of a snapshot file. Opening reads only the header; each column is an
+    np.memmap created on first access, so pages are loaded by the OS on demand and shared
+    between every process that has the same snapshot open.
+    """
+
+    def __init__(self, path: str = SNAPSHOT_PATH):
+        with open(path, 'rb') as f:
+            magic, version, header_len = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                raise ValueError(f"'{path}' is not a version {SNAPSHOT_VERSION} snapshot")
+            header = json.loads(f.read(header_len))
+        self.path = path
+        self.length = header['length']
+        self.categories = header['categories']
+        self.source = header['source']
+        self._data_start = _aligned(_PREAMBLE.size + header_len)
+        self._specs = {column['name']: column for column in header['columns']}
+        self._columns = {}
+
+    @property
+    def column_names(self) -> list:
+        return list(self._specs)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name not in self._columns:
+            spec = self._specs[name]
+            self._columns[name] = np.memmap(self.path, dtype=np.dtype(spec['dtype']), mode='r',
+                                            offset=self._data_start + spec['offset'], shape=(self.length,))
+        return self._columns[name]
+
+    def decode(self, name: str, codes) -> np.ndarray:
+        """Category labels for integer codes of a coded column."""
+        return np.asarray(self.categories[name], dtype=object)[codes]
+
+    def to_frame(self, columns=None) -> pd.DataFrame:
+        """
+        pandas DataFrame for code that still needs one, built only from the requested columns.
+        Coded columns come back as Categoricals and missing integers as NaN, like load_field_data.
+        """
+        data = {name: frame_column(np.asarray(self[name]), self.categories.get(name))
+                for name in columns or self.column_names}
+        return pd.DataFrame(data)
+
+
+def open_snapshot(path: str = SNAPSHOT_PATH, source: str = FILE_PATH) -> Snapshot:
+    """Opens the snapshot, (re)building it first if it is missing or older than the source CSV."""
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(source):
+        print(f"Building snapshot '{path}' from '{source}'...")
+        write_snapshot(load_field_data(source), path, source)
+    return Snapshot(path)
+
+
+# --- Main script execution ---
+if __name__ == "__main__":
+    try:
+        open_snapshot(SNAPSHOT_PATH, FILE_PATH)
+    except FileNotFoundError:
+        print(f"CRITICAL ERROR: The file '{FILE_PATH}' was not found.")
+        exit()
+
+    start_time = time.perf_counter()
+    snapshot = Snapshot(SNAPSHOT_PATH)
+    print(f"Opened snapshot with {len(snapshot)} rows in {(time.perf_counter() - start_time) * 1000:.2f} ms")
+    print(f"Columns: {', '.join(snapshot.column_names)}")
+
+    start_time = time.perf_counter()
+    parasite = snapshot['Parasite']
+    locale = snapshot['Locale']
+    mask = (parasite > 0) & (locale >= 0)
+    means = np.bincount(locale[mask], weights=parasite[mask]) / np.bincount(locale[mask])
+    print(f"\nMean Parasite (> 0) per Locale, straight from the mapped columns ({(time.perf_counter() - start_time) * 1000:.1f} ms):")
+    for name, mean in zip(snapshot.categories['Locale'], means):
+        print(f"  {name}: {mean:.2f}")
+
+    df_view = snapshot.to_frame(['Locale', 'Year', 'Parasite'])
+    print("\nDataFrame view:")
+    print(df_view.head())
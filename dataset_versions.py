@@ -0,0 +1,255 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from field_data import FILE_PATH, clean_field_data
+
+# --- Configuration ---
+VERSIONS_DIR = "dataset_versions"
+MANIFEST_NAME = "releases.json"
+# Per-individual ID column; used as the row key when both releases have it
+ID_COLUMN = 'ID'
+# Otherwise: the capture date and site plus measurements taken once at capture and not expected
+# to be corrected (Datum + Locale alone repeats for almost every row). A correction to one of
+# these shows up as a removed and an added row. Rows sharing all of them are told apart by
+# their order in the file.
+KEY_COLUMNS = ['Datum', 'Locale', 'Sex', 'Age', 'Length']
+
+# Which columns (and which locales, None = all) each analysis reads; used for selective invalidation
+ANALYSIS_DEPENDENCIES = {
+    'age_vs_parasites.py': {'columns': ['Age', 'Parasite'], 'locales': None},
+    'color_locale.py': {'columns': ['Locale', 'Thor.col', 'Morph', 'Parasite'], 'locales': ['Gunnesbo']},
+    'gunnesbo_morph_parasite(vansh).py': {'columns': ['Morph', 'Parasite'], 'locales': ['Gunnesbo']},
+    'gunnesbo_plot.py': {'columns': ['Parasite', 'Length'], 'locales': ['Gunnesbo']},
+    'lomma_boxplot_parasite_year.py': {'columns': ['Datum', 'Parasite'], 'locales': ['Lomma']},
+    'lomma_plot.py': {'columns': ['Parasite', 'Length'], 'locales': ['Lomma']},
+    'morph_parasite.py': {'columns': ['Morph', 'Parasite'], 'locales': None},
+    'parasite_copula.py': {'columns': ['Copula', 'Parasite', 'Datum'], 'locales': None},
+    'parasite_gender.py': {'columns': ['Sex', 'Parasite', 'Datum'], 'locales': ['Lomma']},
+    'parasites_year_lagged.py': {'columns': ['Datum', 'Parasite', 'Length'], 'locales': ['Lomma']},
+    'y_axis_parasite_length.py': {'columns': ['Datum', 'Parasite', 'Length'], 'locales': ['Hoje_A_6']},
+    'thorax_contingency.py': {'columns': ['Datum', 'Thor.col', 'Morph'], 'locales': None},
+    'parasite_sketch.py': {'columns': ['Datum', 'Morph', 'Parasite'], 'locales': None},
+    'parasite_length_moments.py': {'columns': ['Datum', 'Parasite', 'Length'], 'locales': None},
+    'parasite_regression.py': {'columns': ['Datum', 'Parasite', 'Sex', 'Copula', 'Length', 'Morph', 'Age'], 'locales': None},
+    'power_analysis.py': {'columns': ['Parasite'], 'locales': None},
+    'phenology.py': {'columns': ['Datum', 'Parasite', 'Sex'], 'locales': None},
+}
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of the file contents, used as the release's content address."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _load_manifest(versions_dir: str) -> dict:
+    path = os.path.join(versions_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_manifest(versions_dir: str, manifest: dict):
+    path = os.path.join(versions_dir, MANIFEST_NAME)
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+def add_release(csv_path: str, release: str, versions_dir: str = VERSIONS_DIR) -> str:
+    """
+    Stores a release under its content hash (gzip-compressed) and records it in the manifest.
+    Re-adding identical content stores nothing new.
+    """
+    digest = file_digest(csv_path)
+    objects_dir = os.path.join(versions_dir, 'objects')
+    os.makedirs(objects_dir, exist_ok=True)
+    object_path = os.path.join(objects_dir, f"{digest}.csv.gz")
+    if not os.path.exists(object_path):
+        with open(csv_path, 'rb') as src, gzip.open(f"{object_path}.tmp", 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(f"{object_path}.tmp", object_path)
+
+    manifest = _load_manifest(versions_dir)
+    manifest[release] = {
+        'sha256': digest,
+        'source': os.path.abspath(csv_path),
+        'added': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    _save_manifest(versions_dir, manifest)
+    return digest
+
+
+def load_release(release: str, versions_dir: str = VERSIONS_DIR) -> pd.DataFrame:
+    """Reads a stored release back as the raw DataFrame."""
+    manifest = _load_manifest(versions_dir)
+    if release not in manifest:
+        raise KeyError(f"Unknown release '{release}'. Known: {sorted(manifest)}")
+    object_path = os.path.join(versions_dir, 'objects', f"{manifest[release]['sha256']}.csv.gz")
+    return pd.read_csv(object_path, sep=',', low_memory=False, dtype=str, keep_default_na=False)
+
+
+def row_hashes(df_input: pd.DataFrame, key_columns=KEY_COLUMNS) -> pd.DataFrame:
+    """
+    64-bit hash of each row's stable key and of its full content. Values are compared as
+    stripped strings, so formatting-only differences in numbers are still reported.
+    """
+    df = df_input.astype(str).apply(lambda col: col.str.strip())
+    df.columns = df.columns.str.strip()
+    return pd.DataFrame({
+        'key': pd.util.hash_pandas_object(df[key_columns], index=False).to_numpy(),
+        'content': pd.util.hash_pandas_object(df, index=False).to_numpy(),
+    }, index=df.index)
+
+
+def _pair_rows(old_hash: pd.DataFrame, new_hash: pd.DataFrame, on: list) -> pd.DataFrame:
+    """Pairs rows with equal `on` values; the n-th old occurrence goes with the n-th new one."""
+    old = old_hash.assign(_occurrence=old_hash.groupby(on).cumcount()).reset_index()
+    new = new_hash.assign(_occurrence=new_hash.groupby(on).cumcount()).reset_index()
+    return old.merge(new, on=on + ['_occurrence'], how='inner', suffixes=('_old', '_new'))
+
+
+def diff_releases(old_df: pd.DataFrame, new_df: pd.DataFrame, key_columns=None) -> dict:
+    """
+    Added, removed and modified rows between two releases, the columns that changed,
+    and the (Locale, Year) cells touched by any change (in either release), with the number
+    of changed records per cell (a modified record counts once, in both cells if it moved).
+    Identical rows are paired first, so one deleted record does not shift its neighbours;
+    the rest are paired by key (in file order) and count as modified. The key is ID_COLUMN
+    when both releases have it, else KEY_COLUMNS.
+    """
+    old_df = old_df.rename(columns=str.strip)
+    new_df = new_df.rename(columns=str.strip)
+    if key_columns is None:
+        key_columns = [ID_COLUMN] if ID_COLUMN in old_df and ID_COLUMN in new_df else KEY_COLUMNS
+    old_hash = row_hashes(old_df, key_columns)
+    new_hash = row_hashes(new_df, key_columns)
+
+    unchanged = _pair_rows(old_hash, new_hash, ['key', 'content'])
+    old_rest = old_hash.drop(index=unchanged['index_old'])
+    new_rest = new_hash.drop(index=unchanged['index_new'])
+    modified = _pair_rows(old_rest[['key']], new_rest[['key']], ['key'])
+    modified_old = modified['index_old'].to_numpy(dtype=int)
+    modified_new = modified['index_new'].to_numpy(dtype=int)
+    removed_rows = old_rest.index.difference(modified_old).to_numpy(dtype=int)
+    added_rows = new_rest.index.difference(modified_new).to_numpy(dtype=int)
+
+    shared_cols = [col for col in new_df.columns if col in old_df.columns]
+    old_values = old_df.loc[modified_old, shared_cols].astype(str).apply(lambda col: col.str.strip()).to_numpy()
+    new_values = new_df.loc[modified_new, shared_cols].astype(str).apply(lambda col: col.str.strip()).to_numpy()
+    changed = old_values != new_values
+    changed_columns = {col: int(n) for col, n in zip(shared_cols, changed.sum(axis=0)) if n}
+    schema_columns = sorted(set(old_df.columns) ^ set(new_df.columns))
+
+    # Both versions of a modified row share one change id, so it counts once per cell it touches
+    n_removed, n_added = len(removed_rows), len(added_rows)
+    modified_ids = n_removed + n_added + np.arange(len(modified_old))
+    touched = pd.concat([
+        clean_field_data(old_df.loc[np.concatenate([removed_rows, modified_old])]).assign(
+            _change=np.concatenate([np.arange(n_removed), modified_ids])),
+        clean_field_data(new_df.loc[np.concatenate([added_rows, modified_new])]).assign(
+            _change=np.concatenate([n_removed + np.arange(n_added), modified_ids])),
+    ])
+    cells = touched.groupby(['Locale', 'Year'], dropna=False)['_change'].nunique()
+
+    return {
+        'rows_old': len(old_df),
+        'rows_new': len(new_df),
+        'added': added_rows.tolist(),
+        'removed': removed_rows.tolist(),
+        'modified': list(zip(modified_old.tolist(), modified_new.tolist())),
+        'changed_columns': changed_columns,
+        'schema_columns': schema_columns,
+        'affected_cells': [
+            {'Locale': None if pd.isna(locale) else locale, 'Year': None if pd.isna(year) else int(year), 'rows': int(n)}
+            for (locale, year), n in cells.items()
+        ],
+    }
+
+
+def analyses_to_rerun(diff: dict, dependencies=ANALYSIS_DEPENDENCIES) -> list:
+    """
+    Analyses whose inputs changed: added/removed rows or a modified column they read,
+    within the locales they cover. A changed Locale column affects everything.
+    """
+    touched_locales = {cell['Locale'] for cell in diff['affected_cells']}
+    row_set_changed = bool(diff['added'] or diff['removed'])
+    changed_cols = set(diff['changed_columns']) | set(diff['schema_columns'])
+    rerun = []
+    for analysis, deps in dependencies.items():
+        in_scope = deps['locales'] is None or bool(touched_locales & set(deps['locales'])) or None in touched_locales
+        reads_changed = row_set_changed or bool(changed_cols & (set(deps['columns']) | {'Locale'}))
+        if in_scope and reads_changed:
+            rerun.append(analysis)
+    return rerun
+
+
+def print_diff(diff: dict, old_release: str, new_release: str):
+    print(f"\n--- Diff {old_release} -> {new_release} ({diff['rows_old']} -> {diff['rows_new']} rows) ---")
+    print(f"Added: {len(diff['added'])}, Removed: {len(diff['removed'])}, Modified: {len(diff['modified'])}")
+    if diff['changed_columns']:
+        print("Changed values per column: " + ", ".join(f"{col} ({n})" for col, n in diff['changed_columns'].items()))
+    if diff['schema_columns']:
+        print(f"Columns added or removed: {', '.join(diff['schema_columns'])}")
+    cells = pd.DataFrame(diff['affected_cells'], columns=['Locale', 'Year', 'rows'])
+    if not cells.empty:
+        # Label missing keys so rows without a parsable Datum (or Locale) keep their own row/column
+        cells['Year'] = cells['Year'].map(lambda year: "(no date)" if pd.isna(year) else str(int(year)))
+        cells['Locale'] = cells['Locale'].fillna("(no locale)")
+        print(f"\nAffected Locale/Year cells ({len(cells)}):")
+        print(cells.pivot_table(index='Year', columns='Locale', values='rows', aggfunc='sum', fill_value=0))
+    rerun = analyses_to_rerun(diff)
+    print(f"\nAnalyses to rerun ({len(rerun)} of {len(ANALYSIS_DEPENDENCIES)}): {', '.join(rerun) or 'none'}")
+
+
+# --- Main script execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Content-addressed releases of the master dataset and row-level diffs.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    add_cmd = commands.add_parser('add', help="store a release")
+    add_cmd.add_argument('release')
+    add_cmd.add_argument('csv', nargs='?', default=FILE_PATH)
+    diff_cmd = commands.add_parser('diff', help="compare two stored releases")
+    diff_cmd.add_argument('old_release')
+    diff_cmd.add_argument('new_release')
+    diff_cmd.add_argument('--output', help="write the full diff as JSON")
+    commands.add_parser('list', help="list stored releases")
+    args = parser.parse_args()
+
+    if args.command == 'add':
+        try:
+            digest = add_release(args.csv, args.release)
+            print(f"Stored release '{args.release}' from {args.csv} as {digest[:12]}")
+        except FileNotFoundError:
+            print(f"CRITICAL ERROR: The file '{args.csv}' was not found.")
+    elif args.command == 'list':
+        for release, info in _load_manifest(VERSIONS_DIR).items():
+            print(f"{release:<20} {info['sha256'][:12]}  {info['added']}  {info['source']}")
+    else:
+        manifest = _load_manifest(VERSIONS_DIR)
+        if manifest.get(args.old_release, {}).get('sha256') == manifest.get(args.new_release, {}).get('sha256', '-'):
+            print(f"Releases '{args.old_release}' and '{args.new_release}' have identical content; nothing to rerun.")
+        else:
+            try:
+                old_release_df, new_release_df = load_release(args.old_release), load_release(args.new_release)
+            except KeyError as e:
+                print(f"CRITICAL ERROR: {e.args[0]}")
+                exit()
+            release_diff = diff_releases(old_release_df, new_release_df)
+            print_diff(release_diff, args.old_release, args.new_release)
+            if args.output:
+                with open(args.output, 'w') as f:
+                    json.dump(release_diff, f)
+                print(f"Full diff written to {args.output}")
@@ -0,0 +1,168 @@
+import bz2
+import gzip
+import io
+import lzma
+import queue
+import threading
+
+import pandas as pd
+import numpy as np
+
+# --- Configuration shared by the analysis modules ---
+FILE_PATH = "Ischnura_2000-2024.csv"
+
+# Morph spellings seen in the field sheets, mapped onto the three main morphs
+MORPH_MAP = {
+    'violacea-androchrome': 'androchrome',
+    'violacea-infuscans': 'infuscans',
+    'violacea infuscans': 'infuscans',
+    'rufescens': 'obsoleta'
+}
+
+# Compressed inputs are recognised by extension; zstd needs the optional 'zstandard' package
+COMPRESSED_EXTENSIONS = {'.gz': 'gzip', '.xz': 'xz', '.bz2': 'bz2', '.zst': 'zstd'}
+DECOMPRESS_BLOCK_SIZE = 1 << 20     # Bytes handed from the decompression thread to the parser at a time
+DECOMPRESS_QUEUE_BLOCKS = 16        # Blocks decompressed ahead of the parser
+
+# Strings the field team uses for "not recorded"
+INVALID_STRINGS = ['nan', '', 'na', 'n/a', 'none', 'unknown', 'missing']
+
+
+def clean_field_data(df_input: pd.DataFrame) -> pd.DataFrame:
+    """
+    Applies the cleaning steps the individual scripts repeat: stripped column
+    names and locales, lowercase morph/thorax strings, numeric counts and a Year column.
+    """
+    df = df_input.copy()
+    df.columns = df.columns.str.strip()
+
+    if 'Locale' in df.columns:
+        df['Locale'] = df['Locale'].astype(str).str.strip()
+        df.loc[df['Locale'].str.lower().isin(INVALID_STRINGS), 'Locale'] = np.nan
+    if 'Morph' in df.columns:
+        df['Morph'] = df['Morph'].astype(str).str.strip().str.lower().replace(MORPH_MAP)
+        df.loc[df['Morph'].isin(INVALID_STRINGS), 'Morph'] = np.nan
+    if 'Thor.col' in df.columns:
+        df['Thor.col'] = df['Thor.col'].astype(str).str.strip().str.lower()
+        df.loc[df['Thor.col'].isin(INVALID_STRINGS), 'Thor.col'] = np.nan
+    if 'Age' in df.columns:
+        df['Age'] = df['Age'].astype(str).str.strip()
+        df.loc[df['Age'].str.lower().isin(INVALID_STRINGS), 'Age'] = np.nan
+
+    for col in ['Parasite', 'Length', 'Sex', 'Copula']:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    if 'Datum' in df.columns:
+        df['Datum'] = pd.to_datetime(df['Datum'], errors='coerce')
+        df['Year'] = df['Datum'].dt.year
+
+    return df
+
+
+class ThreadedDecompressor(io.RawIOBase):
+    """
+    Read-only stream that decompresses in a background thread. The thread keeps up to
+    DECOMPRESS_QUEUE_BLOCKS blocks ready, so decompression (which releases the GIL in
+    zlib/lzma/bz2/zstd) overlaps with the CSV parser consuming earlier blocks.
+    """
+
+    def __init__(self, compressed_stream):
+        super().__init__()
+        self._source = compressed_stream
+        self._blocks = queue.Queue(maxsize=DECOMPRESS_QUEUE_BLOCKS)
+        self._pending = memoryview(b'')
+        self._finished = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+        self._thread.start()
+
+    def _produce(self):
+        try:
+            while not self._stop.is_set():
+                block = self._source.read(DECOMPRESS_BLOCK_SIZE)
+                self._blocks.put(block)
+                if not block:
+                    return
+        except Exception as e:
+            self._blocks.put(e)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending and not self._finished:
+            block = self._blocks.get()
+            if isinstance(block, Exception):
+                raise block
+            if not block:
+                self._finished = True
+            self._pending = memoryview(block)
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._stop.set()
+            # Unblock the producer if it is waiting on a full queue
+            while self._thread.is_alive():
+                try:
+                    self._blocks.get_nowait()
+                except queue.Empty:
+                    self._thread.join(timeout=0.01)
+            self._source.close()
+        super().close()
+
+
+def _open_compressed(file_path: str, codec: str):
+    if codec == 'gzip':
+        return gzip.open(file_path, 'rb')
+    if codec == 'xz':
+        return lzma.open(file_path, 'rb')
+    if codec == 'bz2':
+        return bz2.open(file_path, 'rb')
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(f"Reading '{file_path}' needs the 'zstandard' package (pip install zstandard).")
+    return zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb'), closefd=True)
+
+
+def open_input(file_path: str):
+    """
+    Binary stream over a CSV that may be gzip/xz/bz2/zstd-compressed. Compressed files are
+    decompressed in a background thread; plain files are opened directly.
+    """
+    for extension, codec in COMPRESSED_EXTENSIONS.items():
+        if str(file_path).endswith(extension):
+            return io.BufferedReader(ThreadedDecompressor(_open_compressed(file_path, codec)), DECOMPRESS_BLOCK_SIZE)
+    return open(file_path, 'rb')
+
+
+def read_field_csv(file_path: str = FILE_PATH, **kwargs) -> pd.DataFrame:
+    """pd.read_csv for plain or compressed inputs."""
+    with open_input(file_path) as stream:
+        return pd.read_csv(stream, sep=',', low_memory=False, **kwargs)
+
+
+def iter_field_chunks(file_path: str = FILE_PATH, chunk_size: int = 100_000, **kwargs):
+    """Yields raw DataFrame chunks of a plain or compressed input, keeping the stream open meanwhile."""
+    with open_input(file_path) as stream:
+        yield from pd.read_csv(stream, sep=',', low_memory=False, chunksize=chunk_size, **kwargs)
+
+
+def load_field_data(file_path: str = FILE_PATH) -> pd.DataFrame:
+    """Reads the master CSV (or a per-locale extract, plain or compressed) and cleans it."""
+    df = read_field_csv(file_path)
+    return clean_field_data(df)
+
+
+def encode_column(series: pd.Series):
+    """
+    Integer-codes a column for bincount-style aggregation.
+    Returns (codes, categories); missing values get code -1.
+    """
+    codes, categories = pd.factorize(series, sort=True)
+    return codes.astype(np.int64), np.asarray(categories)
@@ -1,9 +1,15 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
+from stratified_sample import load_preview
+
+PREVIEW = False  # True: plot a stratified sample that keeps every Locale/Year/Morph stratum
 
 # Load the dataset
-df = pd.read_csv("gunnesbo_data.csv")
+if PREVIEW:
+    df = load_preview("gunnesbo_data.csv")
+else:
+    df = pd.read_csv("gunnesbo_data.csv")
 
 # Filter rows with non-null 'Morph' and 'Parasite' values
 filtered_df = df[['Morph', 'Parasite']].dropna()
@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+import numpy as np
+
+from analysis_service import HOST, PORT
+
+# --- Configuration ---
+CONCURRENCY_LEVELS = [1, 8, 32, 64]
+REQUESTS_PER_LEVEL = 200
+LOCALES = ['Lomma', 'Gunnesbo', 'Hoje_A_6']
+ENDPOINTS = ['/sex-means', '/copula-means', '/morph-kruskal', '/thorax', '/lagged']
+
+
+def request_targets(n: int, level: int = 0) -> list:
+    """
+    A mix of endpoints, locales and year ranges, so both cache hits and misses occur.
+    Each concurrency level uses its own year ranges and so starts with a cold cache.
+    """
+    targets = []
+    for i in range(n):
+        endpoint = ENDPOINTS[i % len(ENDPOINTS)]
+        locale = LOCALES[(i // len(ENDPOINTS)) % len(LOCALES)]
+        year_from = 2000 + (i // (len(ENDPOINTS) * len(LOCALES))) % 5
+        year_to = 2024 - level
+        fmt = 'png' if i % 7 == 0 else 'json'
+        targets.append(f"{endpoint}?locale={locale}&year_from={year_from}&year_to={year_to}&format={fmt}")
+    return targets
+
+
+async def fetch(target: str, host: str = HOST, port: int = PORT):
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    status = int(response.split(b' ', 2)[1])
+    return status, time.perf_counter() - start
+
+
+async def run_level(concurrency: int, targets: list):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(target):
+        async with semaphore:
+            return await fetch(target)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(limited(target) for target in targets))
+    elapsed = time.perf_counter() - start
+    latencies = np.array([latency for _, latency in results]) * 1000
+    errors = sum(status != 200 for status, _ in results)
+    print(f"{concurrency:>11} {len(targets) / elapsed:>8.1f} {np.percentile(latencies, 50):>8.1f} "
+          f"{np.percentile(latencies, 95):>8.1f} {np.percentile(latencies, 99):>8.1f} {latencies.max():>8.1f} {errors:>6}")
+
+
+async def main():
+    print(f"Load test against http://{HOST}:{PORT}/ ({REQUESTS_PER_LEVEL} requests per level)")
+    print(f"{'concurrency':>11} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>6}")
+    for level, concurrency in enumerate(CONCURRENCY_LEVELS):
+        await run_level(concurrency, request_targets(REQUESTS_PER_LEVEL, level))
+
+
+# --- Main script execution ---
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except ConnectionRefusedError:
+        print(f"CRITICAL ERROR: No service on {HOST}:{PORT}. Start analysis_service.py first.")
@@ -1,8 +1,14 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
+from stratified_sample import load_preview
 
-df = pd.read_csv('lomma_data.csv')
+PREVIEW = False  # True: plot a stratified sample that keeps every Locale/Year/Morph stratum
+
+if PREVIEW:
+    df = load_preview('lomma_data.csv')
+else:
+    df = pd.read_csv('lomma_data.csv')
 df['Datum'] = pd.to_datetime(df['Datum'], errors = 'coerce')
 df['Year'] = df['Datum'].dt.year 
 
@@ -1,7 +1,13 @@
 import pandas as pd
+from stratified_sample import load_preview
+
+PREVIEW = False  # True: plot a stratified sample that keeps every Locale/Year/Morph stratum
 
 #Load the full dataset
-df = pd.read_csv("lomma_data.csv")
+if PREVIEW:
+    df = load_preview("lomma_data.csv")
+else:
+    df = pd.read_csv("lomma_data.csv")
 
 df = df.dropna(subset=['Parasite', 'Length'])
 df = df[df['Length']>10]
@@ -3,7 +3,7 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import scikit_posthocs as sp
 from scipy.stats import kruskal
-import itertools
+from letter_display import compact_letter_display, annotate_boxes
 
 # Step 1: Load data (semicolon-separated)
 df = pd.read_csv("Ischnura_2000-2024.csv", sep=',')
@@ -47,32 +47,14 @@ plt.title("Parasite Load by Morph Type with Significance Annotations")
 plt.xlabel("Morph")
 plt.ylabel("Parasite Count")
 
-# Step 4: Add significance stars
-def get_significance_stars(pval):
-    if pval < 0.001:
-        return '***'
-    elif pval < 0.01:
-        return '**'
-    elif pval < 0.05:
-        return '*'
-    else:
-        return ''
+# Step 4: Add compact letter display (morphs sharing a letter do not differ significantly)
+letters = compact_letter_display(posthoc, alpha=0.05, order=order)
+print("Compact letter display (Dunn, Bonferroni):")
+print(letters)
 
-# Position settings
-y_max = df_clean['Parasite'].max()
-height = y_max * 0.05  # spacing between significance lines
-num_lines = 0
-
-for (i, morph1), (j, morph2) in itertools.combinations(enumerate(order), 2):
-    p_val = posthoc.loc[morph1, morph2]
-    star = get_significance_stars(p_val)
-    if star:
-        x1, x2 = i, j
-        y = y_max + height * num_lines
-        h = height / 2
-        ax.plot([x1, x1, x2, x2], [y, y+h, y+h, y], lw=1.3, color='black')
-        ax.text((x1 + x2) / 2, y + h, star, ha='center', va='bottom', color='black', fontsize=12)
-        num_lines += 1
+# Letters sit just above the highest point of each box's group
+y_tops = df_clean.groupby('Morph')['Parasite'].max().reindex(order)
+annotate_boxes(ax, letters, y_tops, offset=df_clean['Parasite'].max() * 0.02)
 
 plt.tight_layout()
 plt.show()
\ No newline at end of file
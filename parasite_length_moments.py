@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from scipy.stats import t as t_dist
+
+from field_data import FILE_PATH, clean_field_data, iter_field_chunks
+
+# --- Configuration ---
+X_COLUMN_NAME = 'Length'
+Y_COLUMN_NAME = 'Parasite'
+GROUP_KEYS = ['Locale', 'Year']
+MIN_LENGTH = 10          # Same body length cut-off as gunnesbo_plot.py / lomma_plot.py
+CHUNK_SIZE = 100_000
+
+MOMENT_COLUMNS = ['n', 'mean_x', 'mean_y', 'm2_x', 'm2_y', 'c_xy']
+
+
+def chunk_moments(df_input: pd.DataFrame, x_col: str = X_COLUMN_NAME, y_col: str = Y_COLUMN_NAME, keys=GROUP_KEYS) -> pd.DataFrame:
+    """
+    Count, means and centred second moments (sum of squares and co-moment) of x and y
+    for each group in one block of rows.
+    """
+    df = df_input.dropna(subset=[x_col, y_col] + list(keys))
+    grouped = df.groupby(keys)
+    dx = df[x_col] - grouped[x_col].transform('mean')
+    dy = df[y_col] - grouped[y_col].transform('mean')
+    parts = pd.DataFrame({'x': df[x_col], 'y': df[y_col], 'dxx': dx * dx, 'dyy': dy * dy, 'dxy': dx * dy})
+    for key in keys:
+        parts[key] = df[key]
+    agg = parts.groupby(keys).agg(
+        n=('x', 'size'), mean_x=('x', 'mean'), mean_y=('y', 'mean'),
+        m2_x=('dxx', 'sum'), m2_y=('dyy', 'sum'), c_xy=('dxy', 'sum')
+    )
+    return agg[MOMENT_COLUMNS]
+
+
+def combine_moments(moments: pd.DataFrame, by=None) -> pd.DataFrame:
+    """
+    Merges accumulator rows (Chan et al. parallel update). Rows sharing the same `by`
+    index levels are combined; with by=None everything collapses into a single row.
+    Combining the same group from two chunks is simply combine_moments(concat, by=keys).
+    """
+    df = moments.reset_index()
+    if by is None:
+        df['All'] = 'All'
+        by = 'All'
+    df['wx'] = df['n'] * df['mean_x']
+    df['wy'] = df['n'] * df['mean_y']
+    totals = df.groupby(by)[['n', 'wx', 'wy']].transform('sum')
+
+    df['mean_x_all'] = totals['wx'] / totals['n']
+    df['mean_y_all'] = totals['wy'] / totals['n']
+    dx = df['mean_x'] - df['mean_x_all']
+    dy = df['mean_y'] - df['mean_y_all']
+    df['m2_x'] = df['m2_x'] + df['n'] * dx * dx
+    df['m2_y'] = df['m2_y'] + df['n'] * dy * dy
+    df['c_xy'] = df['c_xy'] + df['n'] * dx * dy
+
+    combined = df.groupby(by).agg(
+        n=('n', 'sum'), mean_x=('mean_x_all', 'first'), mean_y=('mean_y_all', 'first'),
+        m2_x=('m2_x', 'sum'), m2_y=('m2_y', 'sum'), c_xy=('c_xy', 'sum')
+    )
+    return combined
+
+
+def accumulate_moments(file_path: str = FILE_PATH, x_col: str = X_COLUMN_NAME, y_col: str = Y_COLUMN_NAME,
+                       keys=GROUP_KEYS, chunk_size: int = CHUNK_SIZE) -> pd.DataFrame:
+    """Single streaming pass over the CSV, folding each chunk into the running accumulators."""
+    moments = None
+    for chunk in iter_field_chunks(file_path, chunk_size):
+        chunk = clean_field_data(chunk)
+        chunk = chunk[(chunk[y_col] > 0) & (chunk[x_col] > MIN_LENGTH)]
+        part = chunk_moments(chunk, x_col, y_col, keys)
+        moments = part if moments is None else combine_moments(pd.concat([moments, part]), by=list(keys))
+    return moments
+
+
+def moment_statistics(moments: pd.DataFrame) -> pd.DataFrame:
+    """Means, Pearson r (with two-sided p-value) and the slope of y on x for each accumulator row."""
+    stats = moments[['n', 'mean_x', 'mean_y']].copy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = moments['c_xy'] / np.sqrt(moments['m2_x'] * moments['m2_y'])
+        dof = moments['n'] - 2
+        t_stat = r * np.sqrt(dof / (1 - r * r))
+        stats['r'] = r
+        stats['p_value'] = np.where(dof > 0, 2 * t_dist.sf(np.abs(t_stat), np.maximum(dof, 1)), np.nan)
+        stats['slope'] = moments['c_xy'] / moments['m2_x']
+    return stats
+
+
+def year_mean_moments(moments: pd.DataFrame, by: str = 'Locale') -> pd.DataFrame:
+    """
+    Treats every yearly mean as a single observation and combines them per `by`,
+    giving the year-mean correlation without touching the raw rows again.
+    """
+    yearly = moments[['mean_x', 'mean_y']].copy()
+    yearly['n'] = 1
+    yearly['m2_x'] = 0.0
+    yearly['m2_y'] = 0.0
+    yearly['c_xy'] = 0.0
+    return combine_moments(yearly[MOMENT_COLUMNS], by=by)
+
+
+def compare_correlations(moments: pd.DataFrame) -> pd.DataFrame:
+    """Individual-level vs. year-mean correlation of Parasite and Length for every locale."""
+    individual = moment_statistics(combine_moments(moments, by='Locale'))
+    year_means = moment_statistics(year_mean_moments(moments, by='Locale'))
+    return pd.DataFrame({
+        'n_individuals': individual['n'],
+        'r_individual': individual['r'],
+        'p_individual': individual['p_value'],
+        'slope_individual': individual['slope'],
+        'n_years': year_means['n'],
+        'r_year_means': year_means['r'],
+        'p_year_means': year_means['p_value'],
+    })
+
+
+def plot_correlation_comparison(comparison: pd.DataFrame):
+    x = np.arange(len(comparison))
+    plt.figure(figsize=(12, 6))
+    plt.bar(x - 0.2, comparison['r_individual'], width=0.4, color='mediumseagreen', label='Individual level')
+    plt.bar(x + 0.2, comparison['r_year_means'], width=0.4, color='tomato', label='Yearly means')
+    plt.axhline(0, color='black', lw=0.8)
+    plt.xticks(x, comparison.index, rotation=45, ha='right')
+    plt.ylabel(f"Pearson r ({Y_COLUMN_NAME} vs {X_COLUMN_NAME})")
+    plt.title("Parasite Load vs Body Length: Individual vs Year-Mean Correlation per Locale")
+    plt.legend()
+    plt.grid(axis='y', linestyle='--', alpha=0.6)
+    plt.tight_layout()
+    plt.show()
+
+
+# --- Main script execution ---
+if __name__ == "__main__":
+    try:
+        locale_year_moments = accumulate_moments(FILE_PATH)
+        print(f"Successfully accumulated data from: {FILE_PATH}")
+    except FileNotFoundError:
+        print(f"CRITICAL ERROR: The file '{FILE_PATH}' was not found.")
+        exit()
+
+    comparison = compare_correlations(locale_year_moments)
+    print("\n--- Parasite vs Length correlation per Locale ---")
+    print(comparison.round(4))
+
+    overall = moment_statistics(combine_moments(locale_year_moments)).iloc[0]
+    print(f"\nAll locales: r = {overall['r']:.3f}, p = {overall['p_value']:.3g}, slope = {overall['slope']:.3f} (n = {int(overall['n'])})")
+
+    plot_correlation_comparison(comparison)
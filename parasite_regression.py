@@ -0,0 +1,303 @@
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.special import gammaln
+from scipy.stats import norm
+
+from field_data import FILE_PATH, load_field_data
+
+# --- Configuration ---
+NUMERIC_TERMS = ['Sex', 'Copula', 'Length', 'Year']
+CATEGORICAL_TERMS = ['Morph', 'Age']
+FAMILY = 'ztnegbin'         # 'poisson', 'negbin', 'ztpoisson' or 'ztnegbin' (scripts keep only Parasite > 0)
+WINDOW_YEARS = 5
+MAX_ITER = 50
+TOLERANCE = 1e-8
+RIDGE = 1e-8                # Keeps X'WX solvable when a subset lacks a level of some dummy
+ALPHA_BOUNDS = (1e-8, 1e4)  # Range of the NB2 dispersion alpha (variance mu + alpha * mu^2)
+
+
+def build_design(df_input: pd.DataFrame, numeric_terms=NUMERIC_TERMS, categorical_terms=CATEGORICAL_TERMS,
+                 parasite_col: str = 'Parasite'):
+    """
+    One design matrix for the whole dataset, so every subset shares the same columns.
+    Numeric terms are centred; categorical terms get treatment dummies.
+    Returns (X, y, term_names, df_used).
+    """
+    df = df_input.dropna(subset=[parasite_col] + list(numeric_terms) + list(categorical_terms)).copy()
+    parts = [pd.DataFrame({'Intercept': np.ones(len(df))}, index=df.index)]
+    for col in numeric_terms:
+        parts.append((df[col] - df[col].mean()).rename(col).to_frame())
+    if categorical_terms:
+        parts.append(pd.get_dummies(df[list(categorical_terms)].astype(str), drop_first=True, dtype=float))
+    design = pd.concat(parts, axis=1)
+    return design.to_numpy(dtype=float), df[parasite_col].to_numpy(dtype=float), list(design.columns), df
+
+
+def _family_terms(family: str, y: np.ndarray, mu: np.ndarray, alpha: np.ndarray):
+    """Working residual r and weight W so that the score is X'r and the information X'WX."""
+    if family == 'poisson':
+        return y - mu, mu
+    if family == 'negbin':
+        denom = 1 + alpha * mu
+        return (y - mu) / denom, mu / denom
+    if family == 'ztpoisson':
+        q = -np.expm1(-mu)                  # P(y > 0)
+        return y - mu / q, mu * (q - mu * np.exp(-mu)) / (q * q)
+    if family == 'ztnegbin':
+        denom = 1 + alpha * mu
+        q = -np.expm1(-np.log1p(alpha * mu) / alpha)        # 1 - p0, p0 = (1 + alpha*mu)^(-1/alpha)
+        truncated_mean = mu / q
+        truncated_var = (mu + (1 + alpha) * mu * mu) / q - truncated_mean ** 2
+        return (y - truncated_mean) / denom, truncated_var / (denom * denom)
+    raise ValueError(f"Unknown family '{family}'")
+
+
+def _ztnegbin_loglik(y: np.ndarray, mu: np.ndarray, alpha: np.ndarray) -> np.ndarray:
+    """Zero-truncated NB2 log-likelihood of each row (without the constant -log y!)."""
+    inv = 1 / alpha
+    log1p_am = np.log1p(alpha * mu)
+    log_q = np.log(-np.expm1(-inv * log1p_am))
+    return gammaln(y + inv) - gammaln(inv) + y * (np.log(alpha * mu) - log1p_am) - inv * log1p_am - log_q
+
+
+def _log_alpha_derivatives(y: np.ndarray, mu: np.ndarray, alpha: np.ndarray, seg: np.ndarray, starts: np.ndarray):
+    """Per-subset first and second derivatives of the zero-truncated NB log-likelihood in log(alpha)."""
+    h = 1e-4
+    log_alpha = np.log(alpha)
+    f0, f_up, f_down = (np.add.reduceat(_ztnegbin_loglik(y, mu, np.exp(log_alpha + d)[seg]), starts)
+                        for d in (0.0, h, -h))
+    return (f_up - f_down) / (2 * h), (f_up - 2 * f0 + f_down) / (h * h)
+
+
+def _update_alpha(y: np.ndarray, mu: np.ndarray, alpha: np.ndarray, seg: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """One Newton step per subset on log(alpha) for the zero-truncated NB (ascent direction if not concave)."""
+    grad, hess = _log_alpha_derivatives(y, mu, alpha, seg, starts)
+    step = np.where(hess < 0, -grad / np.where(hess < 0, hess, -1.0), np.sign(grad))
+    return np.exp(np.clip(np.log(alpha) + np.clip(step, -1, 1), *np.log(ALPHA_BOUNDS)))
+
+
+def _segment_information(X: np.ndarray, w: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """X'WX for each stacked subset, one small matmul per segment (no n x p x p temporaries)."""
+    p = X.shape[1]
+    ends = np.append(starts[1:], len(X))
+    info = np.empty((len(starts), p, p))
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        Xs = X[start:end]
+        info[i] = Xs.T @ (w[start:end, None] * Xs)
+    return info
+
+
+def _empty_fit(p: int) -> dict:
+    """Result of fitting no subsets, with the same keys and trailing shapes as fit_stacked."""
+    return {'beta': np.empty((0, p)), 'se': np.empty((0, p)), 'se_robust': np.empty((0, p)),
+            'alpha': np.empty(0), 'n': np.empty(0, dtype=int),
+            'converged': np.empty(0, dtype=bool), 'iterations': np.empty(0, dtype=int), 'names': []}
+
+
+def fit_stacked(X: np.ndarray, y: np.ndarray, starts: np.ndarray, family: str = FAMILY, beta_init=None,
+                max_iter: int = MAX_ITER, tol: float = TOLERANCE) -> dict:
+    """
+    Fits one GLM (log link) per subset with a vectorised IRLS/Fisher-scoring loop.
+    X and y are the subsets' rows stacked one after another; `starts` are the first row of each.
+    Every iteration does a segmented X'WX / X'r and one batched solve for all subsets.
+    For 'ztnegbin' each subset's dispersion is estimated by maximum likelihood alongside beta.
+    'se' is the model-based SE; 'se_robust' the sandwich SE, valid when the variance is misspecified.
+    """
+    n_sub, p = len(starts), X.shape[1]
+    sizes = np.diff(np.append(starts, len(y)))
+    seg = np.repeat(np.arange(n_sub), sizes)
+    present = np.add.reduceat(X != 0, starts, axis=0) > 0       # Columns with data in each subset
+
+    if beta_init is None:
+        beta = np.zeros((n_sub, p))
+        beta[:, 0] = np.log(np.maximum(np.add.reduceat(y, starts) / sizes, 1e-3))
+    else:
+        beta = np.array(np.broadcast_to(beta_init, (n_sub, p)), dtype=float)
+
+    alpha = np.full(n_sub, 1.0 if family == 'ztnegbin' else 0.0)
+    converged = np.zeros(n_sub, dtype=bool)
+    iterations = np.zeros(n_sub, dtype=int)
+    ridge = RIDGE * np.eye(p)
+
+    for _ in range(max_iter):
+        eta = np.clip(np.einsum('ij,ij->i', X, beta[seg]), -30, 30)
+        mu = np.exp(eta)
+        r, w = _family_terms(family, y, mu, alpha[seg])
+        info = _segment_information(X, w, starts) + ridge
+        score = np.add.reduceat(X * r[:, None], starts, axis=0)
+        step = np.linalg.solve(info, score[:, :, None])[:, :, 0]
+        step[converged] = 0.0
+        beta += step
+        iterations += ~converged
+
+        if family == 'negbin':
+            # Cameron-Trivedi moment estimator of the NB2 dispersion
+            pearson = ((y - mu) ** 2 - y) / (mu * mu)
+            alpha = np.maximum(np.add.reduceat(pearson, starts) / np.maximum(sizes - p, 1), 1e-8)
+        alpha_step = np.zeros(n_sub)
+        if family == 'ztnegbin':
+            new_alpha = np.where(converged, alpha, _update_alpha(y, mu, alpha, seg, starts))
+            alpha_step = np.abs(np.log(new_alpha) - np.log(alpha))
+            alpha = new_alpha
+
+        converged |= (np.abs(step).max(axis=1) < tol) & (alpha_step < np.sqrt(tol))
+        if converged.all():
+            break
+
+    mu = np.exp(np.clip(np.einsum('ij,ij->i', X, beta[seg]), -30, 30))
+    r, w = _family_terms(family, y, mu, alpha[seg])
+    info = _segment_information(X, w, starts) + ridge
+    scores = X * r[:, None]
+    if family == 'ztnegbin':
+        # Under truncation beta and alpha are correlated: invert the joint information of (beta, log alpha)
+        h = 1e-4
+        dr = (_family_terms(family, y, mu, alpha[seg] * np.exp(h))[0]
+              - _family_terms(family, y, mu, alpha[seg] * np.exp(-h))[0]) / (2 * h)
+        cross = -np.add.reduceat(X * dr[:, None], starts, axis=0)
+        _, hess = _log_alpha_derivatives(y, mu, alpha, seg, starts)
+        joint = np.zeros((n_sub, p + 1, p + 1))
+        joint[:, :p, :p] = info
+        joint[:, :p, p] = joint[:, p, :p] = cross
+        joint[:, p, p] = np.maximum(-hess, 1e-12)
+        info = joint
+        alpha_score = (_ztnegbin_loglik(y, mu, alpha[seg] * np.exp(h))
+                       - _ztnegbin_loglik(y, mu, alpha[seg] * np.exp(-h))) / (2 * h)
+        scores = np.column_stack([scores, alpha_score])
+    bread = np.linalg.inv(info)
+    meat = _segment_information(scores, np.ones(len(y)), starts)
+    se = np.sqrt(np.abs(np.diagonal(bread, axis1=1, axis2=2)))[:, :p]
+    se_robust = np.sqrt(np.abs(np.diagonal(bread @ meat @ bread, axis1=1, axis2=2)))[:, :p]
+
+    beta[~present] = np.nan
+    se[~present] = np.nan
+    se_robust[~present] = np.nan
+    return {'beta': beta, 'se': se, 'se_robust': se_robust, 'alpha': alpha, 'n': sizes,
+            'converged': converged, 'iterations': iterations}
+
+
+def stack_subsets(X: np.ndarray, y: np.ndarray, subsets: dict):
+    """Stacks the rows selected by each {name: row indices} entry, in order."""
+    names = list(subsets)
+    index = [np.asarray(subsets[name]) for name in names]
+    sizes = np.array([len(i) for i in index])
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    rows = np.concatenate(index)
+    return X[rows], y[rows], starts, names
+
+
+def fit_subsets(X: np.ndarray, y: np.ndarray, subsets: dict, family: str = FAMILY, beta_init=None) -> dict:
+    """Drops subsets too small to fit and runs fit_stacked on the rest (an empty fit if none are left)."""
+    too_small = [name for name, rows in subsets.items() if len(rows) <= X.shape[1]]
+    if too_small:
+        print(f"Warning: {len(too_small)} subset(s) with no more rows than the {X.shape[1]} terms skipped: {too_small}")
+    if beta_init is not None and np.ndim(beta_init) == 2:
+        beta_init = np.asarray(beta_init)[[name not in too_small for name in subsets]]
+    subsets = {name: rows for name, rows in subsets.items() if len(rows) > X.shape[1]}
+    if not subsets:
+        return _empty_fit(X.shape[1])
+    Xs, ys, starts, names = stack_subsets(X, y, subsets)
+    fit = fit_stacked(Xs, ys, starts, family, beta_init=beta_init)
+    fit['names'] = names
+    return fit
+
+
+def fit_year_windows(X: np.ndarray, y: np.ndarray, df_used: pd.DataFrame, window: int = WINDOW_YEARS,
+                     family: str = FAMILY, beta_init=None) -> dict:
+    """
+    Fits every locale over sliding `window`-year spans. Even-numbered windows are fitted first;
+    odd ones then start from the mean of their two neighbours, which overlap them almost entirely.
+    """
+    locale_values = df_used['Locale'].to_numpy()
+    year_values = df_used['Year'].to_numpy()
+    subsets = {}
+    for locale in sorted(df_used['Locale'].unique()):
+        in_locale = locale_values == locale
+        years = np.unique(year_values[in_locale]).astype(int)
+        if years.max() - years.min() + 1 < window:
+            print(f"Warning: Locale '{locale}' spans only {years.min()}-{years.max()}, shorter than "
+                  f"the {window}-year window. No window model fitted.")
+            continue
+        for start in range(years.min(), years.max() - window + 2):
+            mask = in_locale & (year_values >= start) & (year_values < start + window)
+            subsets[(locale, start)] = np.flatnonzero(mask)
+    too_small = [name for name, rows in subsets.items() if len(rows) <= X.shape[1]]
+    if too_small:
+        print(f"Warning: {len(too_small)} window(s) with no more rows than the {X.shape[1]} terms skipped: {too_small}")
+    subsets = {name: rows for name, rows in subsets.items() if len(rows) > X.shape[1]}
+
+    names = list(subsets)
+    even = {name: subsets[name] for i, name in enumerate(names) if i % 2 == 0}
+    odd = {name: subsets[name] for i, name in enumerate(names) if i % 2 == 1}
+
+    first = fit_subsets(X, y, even, family, beta_init=beta_init)
+    solved = dict(zip(first['names'], np.nan_to_num(first['beta'])))
+    position = {name: i for i, name in enumerate(names)}
+
+    if not odd:
+        return first
+
+    fallback = beta_init if beta_init is not None else np.zeros(X.shape[1])
+    warm = []
+    for name in odd:
+        neighbours = [solved[names[j]] for j in (position[name] - 1, position[name] + 1)
+                      if 0 <= j < len(names) and names[j] in solved and names[j][0] == name[0]]
+        warm.append(np.mean(neighbours, axis=0) if neighbours else fallback)
+    second = fit_subsets(X, y, odd, family, beta_init=np.array(warm))
+
+    return {key: np.concatenate([first[key], second[key]]) if key != 'names' else first[key] + second[key]
+            for key in first}
+
+
+def tidy_fit(fit: dict, term_names) -> pd.DataFrame:
+    """Long table with one row per subset and term: coefficient, rate ratio, SE (model and robust), Wald z and p."""
+    rows = []
+    for i, name in enumerate(fit['names']):
+        for j, term in enumerate(term_names):
+            coef, se = fit['beta'][i, j], fit['se'][i, j]
+            z = coef / se if se > 0 else np.nan
+            rows.append({
+                'subset': name, 'term': term, 'coef': coef, 'rate_ratio': np.exp(coef), 'se': se,
+                'se_robust': fit['se_robust'][i, j],
+                'z': z, 'p_value': 2 * norm.sf(abs(z)), 'n': fit['n'][i],
+                'alpha': fit['alpha'][i], 'converged': fit['converged'][i],
+            })
+    return pd.DataFrame(rows)
+
+
+# --- Main script execution ---
+if __name__ == "__main__":
+    try:
+        df_main = load_field_data(FILE_PATH)
+        print(f"Successfully loaded data from: {FILE_PATH}")
+    except FileNotFoundError:
+        print(f"CRITICAL ERROR: The file '{FILE_PATH}' was not found.")
+        exit()
+
+    if FAMILY.startswith('zt'):
+        df_main = df_main[df_main['Parasite'] > 0]
+    df_main = df_main[df_main['Sex'].isin([0, 1]) & df_main['Copula'].isin([0, 1])]
+    X, y, terms, df_used = build_design(df_main.dropna(subset=['Locale']))
+    print(f"Design: {len(y)} rows x {len(terms)} terms ({', '.join(terms)})")
+
+    start_time = time.perf_counter()
+    pooled = fit_stacked(X, y, np.array([0]), FAMILY)
+    pooled['names'] = ['All']
+    print("\n--- Pooled model ---")
+    print(tidy_fit(pooled, terms)[['term', 'coef', 'rate_ratio', 'se', 'se_robust', 'p_value']].round(4).to_string(index=False))
+
+    locale_rows = {locale: np.flatnonzero(df_used['Locale'].to_numpy() == locale) for locale in sorted(df_used['Locale'].unique())}
+    by_locale = fit_subsets(X, y, locale_rows, FAMILY, beta_init=pooled['beta'][0])
+    by_window = fit_year_windows(X, y, df_used, WINDOW_YEARS, FAMILY, beta_init=pooled['beta'][0])
+    elapsed = time.perf_counter() - start_time
+
+    locale_table = tidy_fit(by_locale, terms)
+    print("\n--- Sex and Copula effects per Locale ---")
+    print(locale_table[locale_table['term'].isin(['Sex', 'Copula'])].round(4).to_string(index=False))
+
+    window_table = tidy_fit(by_window, terms)
+    print(f"\nFitted {len(by_locale['names'])} locale models and {len(by_window['names'])} "
+          f"{WINDOW_YEARS}-year window models in {elapsed:.2f} s "
+          f"({int(by_window['converged'].sum())} windows converged)")
+    print(window_table[window_table['term'] == 'Length'].head(10).round(4).to_string(index=False))
@@ -0,0 +1,208 @@
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+from field_data import FILE_PATH, clean_field_data, iter_field_chunks
+
+# --- Configuration ---
+SKETCH_K = 200          # Items kept at the top level; groups up to this size stay exact
+CHUNK_SIZE = 100_000    # Rows read from the CSV per chunk
+GROUP_KEYS = ['Locale', 'Year', 'Morph']
+
+
+class QuantileSketch:
+    """
+    Mergeable KLL quantile sketch. Items at level h stand for 2**h observations;
+    a level that outgrows its capacity is sorted and every other item is promoted.
+    Until more than k values have been seen nothing is compacted, so small groups are exact.
+    """
+
+    def __init__(self, k: int = SKETCH_K, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - 1 - level
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                pairs = items[:len(items) - len(keep)]
+                promoted = pairs[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.count += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other: "QuantileSketch"):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def copy(self) -> "QuantileSketch":
+        """Independent copy; its compaction coin flips come from a child of this sketch's RNG."""
+        clone = QuantileSketch(self.k, seed=self._rng.spawn(1)[0])
+        clone.levels = [items.copy() for items in self.levels]
+        clone.count, clone.min, clone.max = self.count, self.min, self.max
+        return clone
+
+    @property
+    def is_exact(self) -> bool:
+        return len(self.levels) == 1
+
+    def _weighted_items(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lvl), 2 ** h) for h, lvl in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], weights[order]
+
+    def quantile(self, q):
+        """Quantile(s) with linear interpolation; matches np.quantile while the sketch is exact."""
+        if self.count == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        items, weights = self._weighted_items()
+        if self.is_exact:
+            return np.quantile(items, q)
+        # Each item sits at the middle of the rank range it represents
+        positions = (np.cumsum(weights) - weights / 2) / weights.sum()
+        result = np.interp(q, positions, items)
+        return np.clip(result, self.min, self.max)
+
+    def box_stats(self, whis: float = 1.5, label=None) -> dict:
+        """Summary statistics in the layout matplotlib's Axes.bxp expects."""
+        q1, med, q3 = self.quantile([0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        lo_fence, hi_fence = q1 - whis * iqr, q3 + whis * iqr
+        items = np.concatenate(self.levels)
+        inside = items[(items >= lo_fence) & (items <= hi_fence)]
+        whislo = inside.min() if len(inside) else q1
+        whishi = inside.max() if len(inside) else q3
+        # Outlier candidates are the retained items beyond the fences
+        fliers = np.unique(items[(items < lo_fence) | (items > hi_fence)])
+        return {
+            'label': label,
+            'med': med, 'q1': q1, 'q3': q3,
+            'whislo': whislo, 'whishi': whishi,
+            'fliers': fliers,
+            'n': self.count,
+        }
+
+
+def build_sketches(file_path: str = FILE_PATH, keys=GROUP_KEYS, value_col: str = 'Parasite',
+                   positive_only: bool = True, chunk_size: int = CHUNK_SIZE, k: int = SKETCH_K, seed: int = 0) -> dict:
+    """
+    Streams the CSV in chunks and keeps one sketch per group key tuple; a missing key part
+    is stored as None so the same group is found again in later chunks.
+    Only one chunk of raw rows is held in memory at a time. Every sketch gets its own
+    random stream (spawned from `seed`), so compaction errors are independent across groups.
+    """
+    seed_sequence = np.random.SeedSequence(seed)
+    sketches = {}
+    for chunk in iter_field_chunks(file_path, chunk_size):
+        chunk = clean_field_data(chunk)
+        chunk = chunk.dropna(subset=[value_col])
+        if positive_only:
+            chunk = chunk[chunk[value_col] > 0]
+        for key, values in chunk.groupby(keys, sort=False, dropna=False)[value_col]:
+            key = tuple(None if pd.isna(part) else part for part in key)
+            if key not in sketches:
+                sketches[key] = QuantileSketch(k, seed=seed_sequence.spawn(1)[0])
+            sketches[key].update(values.to_numpy())
+    return sketches
+
+
+def collapse_sketches(sketches: dict, keep, keys=GROUP_KEYS) -> dict:
+    """Merges sketches over every key not in `keep`; groups with a missing kept key are skipped."""
+    positions = [keys.index(name) for name in keep]
+    collapsed = {}
+    for key, sketch in sketches.items():
+        sub_key = tuple(key[p] for p in positions)
+        if any(pd.isna(part) for part in sub_key):
+            continue
+        if len(sub_key) == 1:
+            sub_key = sub_key[0]
+        if sub_key in collapsed:
+            collapsed[sub_key].merge(sketch)
+        else:
+            collapsed[sub_key] = sketch.copy()
+    return collapsed
+
+
+def plot_boxes_from_sketches(sketches: dict, ax=None, title: str = "", xlabel: str = "", ylabel: str = "Number of Parasites", order=None):
+    """Boxplot drawn from sketch summaries instead of raw arrays."""
+    if ax is None:
+        _, ax = plt.subplots(figsize=(10, 6))
+    labels = order if order is not None else sorted(sketches)
+    stats = [sketches[label].box_stats(label=int(label) if isinstance(label, float) else label) for label in labels]
+    if stats:
+        ax.bxp(stats, showfliers=True, patch_artist=True,
+               boxprops={'facecolor': 'lightsteelblue'}, medianprops={'color': 'black'})
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.grid(True, linestyle='--', alpha=0.6)
+    return ax
+
+
+# --- Main script execution ---
+if __name__ == "__main__":
+    try:
+        group_sketches = build_sketches(FILE_PATH)
+        print(f"Successfully sketched data from: {FILE_PATH} ({len(group_sketches)} Locale/Year/Morph groups)")
+    except FileNotFoundError:
+        print(f"CRITICAL ERROR: The file '{FILE_PATH}' was not found.")
+        exit()
+
+    # Per-morph medians, as morph_parasite.py computes them
+    by_morph = collapse_sketches(group_sketches, keep=['Morph'])
+    morph_order = sorted(by_morph, key=lambda m: by_morph[m].quantile(0.5), reverse=True)
+    print("\n--- Median Parasite Load per Morph ---")
+    for morph in morph_order:
+        print(f"  {morph}: median = {by_morph[morph].quantile(0.5):.1f} (n = {by_morph[morph].count})")
+
+    plot_boxes_from_sketches(by_morph, title="Parasite Load by Morph Type", xlabel="Morph", order=morph_order)
+    plt.tight_layout()
+    plt.show()
+
+    # Yearly boxes for every locale
+    by_locale_year = collapse_sketches(group_sketches, keep=['Locale', 'Year'])
+    locales = sorted({locale for locale, _ in by_locale_year})
+    n_cols = 2
+    n_rows = int(np.ceil(len(locales) / n_cols))
+    fig, axes = plt.subplots(n_rows, n_cols, figsize=(16, 4 * n_rows), squeeze=False)
+    for ax, locale in zip(axes.flat, locales):
+        yearly = {year: sketch for (loc, year), sketch in by_locale_year.items() if loc == locale}
+        plot_boxes_from_sketches(yearly, ax=ax, title=f"Parasite distribution in {locale}", xlabel="Year")
+        ax.tick_params(axis='x', rotation=45)
+    for ax in axes.flat[len(locales):]:
+        ax.set_visible(False)
+    fig.tight_layout()
+    plt.show()
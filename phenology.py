@@ -0,0 +1,133 @@
+import time
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from scipy.ndimage import convolve1d
+
+from field_data import FILE_PATH, load_field_data, encode_column
+
+# --- Configuration ---
+SEASON_START = (5, 1)       # (month, day) taken as day 0 of every season
+SEASON_DAYS = 153           # 1 May - 30 September
+WINDOW_DAYS = 14            # Width of the sliding window (the box kernel rounds it up to the next odd width)
+KERNEL = 'gaussian'         # 'box' for a plain rolling window, 'gaussian' for kernel smoothing
+MIN_WINDOW_N = 5            # Windows with fewer individuals are left out of the curves
+GROUP_KEYS = ['Locale', 'Year', 'Sex']
+SEX_LABELS = {0: 'Females (0)', 1: 'Males (1)'}
+
+
+def add_season_day(df_input: pd.DataFrame, date_col: str = 'Datum') -> pd.DataFrame:
+    """Adds 'SeasonDay': days since SEASON_START in the same year."""
+    df = df_input.copy()
+    dates = df[date_col]
+    season_start = pd.to_datetime({'year': dates.dt.year, 'month': SEASON_START[0], 'day': SEASON_START[1]}, errors='coerce')
+    df['SeasonDay'] = (dates - season_start).dt.days
+    return df
+
+
+def _kernel_weights(window: int, kernel: str) -> np.ndarray:
+    if kernel == 'box':
+        # Odd length keeps the window centred on each day (an even one would run day-7..day+6)
+        return np.ones(2 * (window // 2) + 1)
+    if kernel == 'gaussian':
+        offsets = np.arange(-window, window + 1)
+        return np.exp(-0.5 * (offsets / (window / 2.355)) ** 2)     # FWHM equal to the window
+    raise ValueError(f"Unknown kernel '{kernel}'")
+
+
+def season_curves(df_input: pd.DataFrame, keys=GROUP_KEYS, window: int = WINDOW_DAYS, kernel: str = KERNEL,
+                  n_days: int = SEASON_DAYS, min_n: int = MIN_WINDOW_N) -> pd.DataFrame:
+    """
+    Smoothed parasite prevalence (share with Parasite > 0) and intensity (mean Parasite among
+    infected) per group and season day. Daily totals for every group are built with one bincount
+    over group x day cells, then all groups are smoothed together along the day axis.
+    """
+    df = add_season_day(df_input.dropna(subset=['Parasite', 'Datum'] + list(keys)))
+    df = df[(df['SeasonDay'] >= 0) & (df['SeasonDay'] < n_days)]
+
+    codes = []
+    categories = []
+    for key in keys:
+        key_codes, key_categories = encode_column(df[key])
+        codes.append(key_codes)
+        categories.append(key_categories)
+    shape = tuple(len(c) for c in categories)
+    group = np.ravel_multi_index(codes, shape) if codes else np.zeros(len(df), dtype=np.int64)
+    n_groups = int(np.prod(shape))
+
+    cell = group * n_days + df['SeasonDay'].to_numpy(dtype=np.int64)
+    parasite = df['Parasite'].to_numpy(dtype=float)
+    infected = parasite > 0
+    size = n_groups * n_days
+    daily_n = np.bincount(cell, minlength=size).reshape(n_groups, n_days).astype(float)
+    daily_inf = np.bincount(cell, weights=infected, minlength=size).reshape(n_groups, n_days)
+    daily_load = np.bincount(cell, weights=parasite, minlength=size).reshape(n_groups, n_days)
+
+    weights = _kernel_weights(window, kernel)
+    smooth_n = convolve1d(daily_n, weights, axis=1, mode='constant')
+    smooth_inf = convolve1d(daily_inf, weights, axis=1, mode='constant')
+    smooth_load = convolve1d(daily_load, weights, axis=1, mode='constant')
+    # Effective number of individuals in the window (equal to the count for the box kernel)
+    window_n = convolve1d(daily_n, (weights > 0.5 * weights.max()).astype(float), axis=1, mode='constant')
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        prevalence = smooth_inf / smooth_n
+        intensity = smooth_load / smooth_inf
+
+    group_idx, day_idx = np.nonzero(window_n >= min_n)
+    curves = pd.DataFrame({'SeasonDay': day_idx})
+    for key, key_codes, key_categories in zip(keys, np.unravel_index(group_idx, shape), categories):
+        curves[key] = key_categories[key_codes]
+    curves['n_window'] = window_n[group_idx, day_idx].astype(int)
+    curves['prevalence'] = prevalence[group_idx, day_idx]
+    curves['intensity'] = intensity[group_idx, day_idx]
+    return curves[list(keys) + ['SeasonDay', 'n_window', 'prevalence', 'intensity']]
+
+
+def plot_season_curves(curves: pd.DataFrame, locale: str, metrics=('prevalence', 'intensity')):
+    """One panel per metric and sex; a line per year, coloured from early to late years."""
+    subset = curves[curves['Locale'] == locale]
+    if subset.empty:
+        print(f"No season curves for locale '{locale}'.")
+        return
+    sexes = sorted(subset['Sex'].unique())
+    years = sorted(subset['Year'].unique())
+    cmap = plt.get_cmap('viridis')
+
+    fig, axes = plt.subplots(len(metrics), len(sexes), figsize=(7 * len(sexes), 4 * len(metrics)), sharex=True, squeeze=False)
+    for row, metric in enumerate(metrics):
+        for col, sex in enumerate(sexes):
+            ax = axes[row, col]
+            for i, year in enumerate(years):
+                curve = subset[(subset['Sex'] == sex) & (subset['Year'] == year)]
+                ax.plot(curve['SeasonDay'], curve[metric], color=cmap(i / max(len(years) - 1, 1)), lw=1.2, label=int(year))
+            ax.set_title(f"{metric.capitalize()} - {SEX_LABELS.get(sex, sex)}")
+            ax.grid(True, linestyle='--', alpha=0.6)
+    axes[0, -1].legend(title="Year", fontsize=7, ncol=2, loc='upper right')
+    fig.supxlabel(f"Day of season (0 = {SEASON_START[1]}/{SEASON_START[0]})")
+    fig.suptitle(f"Within-Season Parasite Prevalence and Intensity in {locale} ({WINDOW_DAYS}-day {KERNEL} window)")
+    fig.tight_layout()
+    plt.show()
+
+
+# --- Main script execution ---
+if __name__ == "__main__":
+    try:
+        df_main = load_field_data(FILE_PATH)
+        print(f"Successfully loaded data from: {FILE_PATH}")
+    except FileNotFoundError:
+        print(f"CRITICAL ERROR: The file '{FILE_PATH}' was not found.")
+        exit()
+
+    df_main = df_main[df_main['Sex'].isin([0, 1])]
+    start_time = time.perf_counter()
+    curves = season_curves(df_main)
+    print(f"Computed {len(curves)} group-day points in {time.perf_counter() - start_time:.2f} s")
+
+    peak = curves.loc[curves.groupby(['Locale', 'Year'])['prevalence'].idxmax(), ['Locale', 'Year', 'SeasonDay', 'prevalence']]
+    print("\n--- Season day of peak prevalence (either sex) ---")
+    print(peak.pivot_table(index='Year', columns='Locale', values='SeasonDay', aggfunc='min'))
+
+    for locale in sorted(curves['Locale'].unique()):
+        plot_season_curves(curves, locale)
@@ -0,0 +1,288 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from scipy.optimize import brentq, minimize
+from scipy.stats import t as t_dist, norm, chi2, nbinom, rankdata
+
+from field_data import FILE_PATH, load_field_data
+
+# --- Configuration ---
+SAMPLE_SIZES = [5, 10, 20, 30, 50, 75, 100, 150, 200]   # Individuals per group
+EFFECT_SIZES = [1.0, 1.1, 1.25, 1.5, 2.0]               # Ratio of mean tested parasite load, group B / group A
+N_SIMULATIONS = 2000
+N_GROUPS_KRUSKAL = 3        # e.g. the three main morphs
+SIGNIFICANCE_LEVEL = 0.05
+MIN_ROWS_PER_LOCALE = 30
+MAX_DISPERSION = 1e4       # Fitted k above this is treated as Poisson
+EXACT_MAX_N = 8            # Mann-Whitney uses the exact null distribution (no ties) up to this size, as scipy
+MAX_WORKERS = None          # ProcessPoolExecutor default (number of CPUs)
+
+
+def fit_negbin_moments(values: np.ndarray):
+    """Method-of-moments negative binomial (mean, dispersion k); k = inf means Poisson."""
+    mean = values.mean()
+    var = values.var(ddof=1)
+    k = mean ** 2 / (var - mean) if var > mean else np.inf
+    return mean, k
+
+
+def zero_probability(mu, k):
+    """P(0) of a negative binomial with mean mu and dispersion k (Poisson when k = inf)."""
+    return np.exp(-mu) if np.isinf(k) else (k / (k + mu)) ** k
+
+
+def truncated_mean(mu, k):
+    """Mean of the zero-truncated negative binomial, i.e. of the counts left after dropping zeros."""
+    return mu / (1 - zero_probability(mu, k))
+
+
+def untruncated_mu(target_mean: float, k: float) -> float:
+    """The NB mean mu whose zero-truncated mean equals target_mean (which must exceed 1)."""
+    if target_mean <= 1 + 1e-9:
+        return 1e-9
+    # truncated_mean rises from 1 (mu -> 0) and exceeds mu, so the root lies in (0, target_mean)
+    return brentq(lambda mu: truncated_mean(mu, k) - target_mean, 1e-9, target_mean)
+
+
+def fit_truncated_negbin(values: np.ndarray):
+    """
+    Maximum-likelihood zero-truncated negative binomial for counts that are all > 0.
+    Returns the mean mu and dispersion k of the underlying (untruncated) NB; k = inf means Poisson.
+    """
+    counts, freq = np.unique(values, return_counts=True)
+
+    def neg_loglik(params):
+        mu, k = np.exp(params)
+        p0 = (k / (k + mu)) ** k
+        return -(freq * (nbinom.logpmf(counts, k, k / (k + mu)) - np.log1p(-p0))).sum()
+
+    mu0, k0 = fit_negbin_moments(values)
+    k0 = 1.0 if np.isinf(k0) else k0
+    fit = minimize(neg_loglik, np.log([mu0, k0]), method='Nelder-Mead',
+                   options={'xatol': 1e-6, 'fatol': 1e-8, 'maxiter': 2000})
+    mu, k = np.exp(fit.x)
+    if k > MAX_DISPERSION:
+        # Likelihood flat in k: no overdispersion, fit the zero-truncated Poisson directly
+        mu, k = untruncated_mu(values.mean(), np.inf), np.inf
+    return mu, k
+
+
+def fit_locale_distributions(df_input: pd.DataFrame, positive_only: bool = True) -> pd.DataFrame:
+    """
+    Negative binomial parameters of Parasite per locale, from the real data.
+    With positive_only (the scripts drop Parasite == 0) a zero-truncated NB is fitted by maximum
+    likelihood to the positive counts; otherwise a method-of-moments NB to all counts.
+    'mu' and 'k' describe the untruncated NB; 'mean' is the mean of the counts the tests see.
+    """
+    df = df_input.dropna(subset=['Locale', 'Parasite'])
+    if positive_only:
+        df = df[df['Parasite'] > 0]
+    rows = []
+    for locale, group in df.groupby('Locale'):
+        if len(group) < MIN_ROWS_PER_LOCALE:
+            continue
+        values = group['Parasite'].to_numpy(dtype=float)
+        mu, k = fit_truncated_negbin(values) if positive_only else fit_negbin_moments(values)
+        rows.append({'Locale': locale, 'n_observed': len(group), 'mean': values.mean(), 'mu': mu, 'k': k})
+    return pd.DataFrame(rows).set_index('Locale')
+
+
+def draw_counts(rng: np.random.Generator, mu: float, k: float, size, positive_only: bool = True) -> np.ndarray:
+    """
+    Draws from the untruncated negative binomial (or Poisson) with mean mu; with positive_only
+    zeros are redrawn, which samples the zero-truncated NB that fit_truncated_negbin estimates.
+    """
+    def draw(shape):
+        if np.isinf(k):
+            return rng.poisson(mu, shape)
+        return rng.negative_binomial(k, k / (k + mu), shape)
+
+    counts = draw(size).astype(float)
+    if positive_only:
+        zeros = counts == 0
+        while zeros.any():
+            counts[zeros] = draw(zeros.sum())
+            zeros = counts == 0
+    return counts
+
+
+def shifted_mu(mu: float, k: float, effect: float, positive_only: bool = True) -> float:
+    """
+    Untruncated mean for the shifted group, chosen so that the mean of the counts actually
+    tested (zero-truncated when positive_only) is `effect` times the baseline's.
+    """
+    if not positive_only:
+        return mu * effect
+    return untruncated_mu(effect * truncated_mean(mu, k), k)
+
+
+def welch_pvalues(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Welch's t-test along the last axis (as ttest_ind(equal_var=False))."""
+    na, nb = a.shape[-1], b.shape[-1]
+    va, vb = a.var(axis=-1, ddof=1) / na, b.var(axis=-1, ddof=1) / nb
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t_stat = (a.mean(axis=-1) - b.mean(axis=-1)) / np.sqrt(va + vb)
+        dof = (va + vb) ** 2 / (va ** 2 / (na - 1) + vb ** 2 / (nb - 1))
+    return np.where(np.isfinite(t_stat), 2 * t_dist.sf(np.abs(t_stat), dof), 1.0)
+
+
+def _tie_term(ranks_input: np.ndarray) -> np.ndarray:
+    """Sum of t^3 - t over tie groups, per row."""
+    sorted_vals = np.sort(ranks_input, axis=-1)
+    n = sorted_vals.shape[-1]
+    # Run lengths of equal values via boundaries in each sorted row
+    new_run = np.ones(sorted_vals.shape, dtype=bool)
+    new_run[..., 1:] = sorted_vals[..., 1:] != sorted_vals[..., :-1]
+    run_id = np.cumsum(new_run, axis=-1) - 1
+    offsets = (np.arange(sorted_vals.shape[0]) * n)[:, None]
+    lengths = np.bincount((run_id + offsets).ravel(), minlength=sorted_vals.shape[0] * n).reshape(-1, n)
+    return (lengths ** 3 - lengths).sum(axis=-1)
+
+
+@lru_cache(maxsize=None)
+def _exact_u_sf(na: int, nb: int) -> np.ndarray:
+    """P(U >= u) for u = 0..na*nb under the null, without ties (counts of rank arrangements)."""
+    # f[m][u]: arrangements of m values of group A among nb of group B giving U = u, built up over nb
+    f = [np.zeros(m * nb + 1) for m in range(na + 1)]
+    for m in range(na + 1):
+        f[m][0] = 1.0
+    for j in range(1, nb + 1):
+        new = [np.zeros(m * j + 1) for m in range(na + 1)]
+        new[0][0] = 1.0
+        for m in range(1, na + 1):
+            new[m][:m * (j - 1) + 1] += f[m][:m * (j - 1) + 1]
+            new[m][j:] += new[m - 1]
+        f = new
+    pmf = f[na] / f[na].sum()
+    return np.cumsum(pmf[::-1])[::-1]
+
+
+def mannwhitney_pvalues(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Two-sided Mann-Whitney U as scipy's mannwhitneyu(method='auto'): tie-corrected normal
+    approximation with continuity correction, except that rows without ties use the exact
+    null distribution when either group has at most EXACT_MAX_N values.
+    """
+    na, nb = a.shape[-1], b.shape[-1]
+    pooled = np.concatenate([a, b], axis=-1)
+    ranks = rankdata(pooled, axis=-1)
+    u = ranks[:, :na].sum(axis=-1) - na * (na + 1) / 2
+    u_max = np.maximum(u, na * nb - u)
+    n = na + nb
+    ties = _tie_term(pooled)
+    sigma = np.sqrt(na * nb / 12 * ((n + 1) - ties / (n * (n - 1))))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = (u_max - na * nb / 2 - 0.5) / sigma
+    pvalues = np.where(sigma > 0, np.minimum(2 * norm.sf(z), 1.0), 1.0)
+    if min(na, nb) <= EXACT_MAX_N:
+        exact = ties == 0
+        sf = _exact_u_sf(min(na, nb), max(na, nb))
+        pvalues[exact] = np.minimum(2 * sf[u_max[exact].astype(int)], 1.0)
+    return pvalues
+
+
+def kruskal_pvalues(groups: np.ndarray) -> np.ndarray:
+    """Kruskal-Wallis H with tie correction; groups has shape (n_sim, n_groups, n_per_group)."""
+    n_sim, g, m = groups.shape
+    pooled = groups.reshape(n_sim, g * m)
+    ranks = rankdata(pooled, axis=-1).reshape(n_sim, g, m)
+    n = g * m
+    h = 12 / (n * (n + 1)) * (ranks.sum(axis=-1) ** 2 / m).sum(axis=-1) - 3 * (n + 1)
+    ties = 1 - _tie_term(pooled) / (n ** 3 - n)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        h = h / ties
+    return np.where(ties > 0, chi2.sf(h, g - 1), 1.0)
+
+
+def simulate_power(task) -> list:
+    """
+    Power of the three tests for one (locale, sample size) over every effect size.
+    All simulated datasets for a cell are drawn and tested as one array.
+    """
+    locale, mu, k, n, effect_sizes, n_sim, seed = task
+    rng = np.random.default_rng(seed)
+    rows = []
+    for effect in effect_sizes:
+        mu_effect = shifted_mu(mu, k, effect)
+        a = draw_counts(rng, mu, k, (n_sim, n))
+        b = draw_counts(rng, mu_effect, k, (n_sim, n))
+        # Kruskal: one group shifted by the effect, the others at the locale baseline
+        groups = draw_counts(rng, mu, k, (n_sim, N_GROUPS_KRUSKAL, n))
+        groups[:, -1, :] = draw_counts(rng, mu_effect, k, (n_sim, n))
+        rows.append({
+            'Locale': locale, 'n_per_group': n, 'effect': effect,
+            'welch_t': (welch_pvalues(a, b) < SIGNIFICANCE_LEVEL).mean(),
+            'mann_whitney': (mannwhitney_pvalues(a, b) < SIGNIFICANCE_LEVEL).mean(),
+            'kruskal': (kruskal_pvalues(groups) < SIGNIFICANCE_LEVEL).mean(),
+        })
+    return rows
+
+
+def run_power_grid(distributions: pd.DataFrame, sample_sizes=SAMPLE_SIZES, effect_sizes=EFFECT_SIZES,
+                   n_sim: int = N_SIMULATIONS, max_workers=MAX_WORKERS, seed: int = 0) -> pd.DataFrame:
+    """Spreads the locale x sample size grid over a process pool; each task is vectorised internally."""
+    seeds = np.random.SeedSequence(seed).spawn(len(distributions) * len(sample_sizes))
+    tasks = []
+    for i, (locale, params) in enumerate(distributions.iterrows()):
+        for j, n in enumerate(sample_sizes):
+            tasks.append((locale, params['mu'], params['k'], n, list(effect_sizes), n_sim,
+                          seeds[i * len(sample_sizes) + j]))
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        results = pool.map(simulate_power, tasks)
+    return pd.DataFrame([row for rows in results for row in rows])
+
+
+def required_sample_size(power: pd.DataFrame, test: str = 'mann_whitney', target: float = 0.8) -> pd.DataFrame:
+    """Smallest simulated n per group reaching the target power, per locale and effect size."""
+    reached = power[power[test] >= target]
+    table = reached.groupby(['Locale', 'effect'])['n_per_group'].min().unstack('effect')
+    return table.reindex(index=power['Locale'].unique(), columns=sorted(power['effect'].unique()))
+
+
+def plot_power_curves(power: pd.DataFrame, test: str = 'mann_whitney', n_cols: int = 3):
+    locales = power['Locale'].unique()
+    n_rows = int(np.ceil(len(locales) / n_cols))
+    fig, axes = plt.subplots(n_rows, n_cols, figsize=(5 * n_cols, 4 * n_rows), sharey=True, squeeze=False)
+    for ax, locale in zip(axes.flat, locales):
+        subset = power[power['Locale'] == locale]
+        for effect, curve in subset.groupby('effect'):
+            ax.plot(curve['n_per_group'], curve[test], marker='o', label=f"x{effect:g}")
+        ax.axhline(0.8, color='gray', linestyle='--', lw=1)
+        ax.set_title(locale)
+        ax.grid(True, linestyle='--', alpha=0.6)
+    for ax in axes.flat[len(locales):]:
+        ax.set_visible(False)
+    axes.flat[0].legend(title="Mean ratio")
+    fig.supxlabel("Individuals per group")
+    fig.supylabel(f"Power ({test}, alpha={SIGNIFICANCE_LEVEL})")
+    fig.suptitle("Simulated Power to Detect a Difference in Parasite Load")
+    fig.tight_layout()
+    plt.show()
+
+
+# --- Main script execution ---
+if __name__ == "__main__":
+    try:
+        df_main = load_field_data(FILE_PATH)
+        print(f"Successfully loaded data from: {FILE_PATH}")
+    except FileNotFoundError:
+        print(f"CRITICAL ERROR: The file '{FILE_PATH}' was not found.")
+        exit()
+
+    distributions = fit_locale_distributions(df_main)
+    print("\n--- Zero-truncated negative binomial fits per Locale (Parasite > 0) ---")
+    print(distributions.round(3))
+
+    start_time = time.perf_counter()
+    power = run_power_grid(distributions)
+    print(f"\nSimulated {len(power)} grid cells x {N_SIMULATIONS} datasets in {time.perf_counter() - start_time:.1f} s")
+
+    for test in ['welch_t', 'mann_whitney', 'kruskal']:
+        print(f"\n--- Individuals per group needed for 80% power ({test}) ---")
+        print(required_sample_size(power, test))
+
+    plot_power_curves(power)
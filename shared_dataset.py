@@ -0,0 +1,190 @@
+import signal
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from field_data import FILE_PATH, load_field_data, encode_column
+
+# Columns published to workers and their fixed-width dtypes; -1 marks a missing code
+CODED_COLUMNS = {'Locale': np.int16, 'Morph': np.int16}
+NUMERIC_COLUMNS = {'Sex': np.int8, 'Year': np.int16, 'Parasite': np.float64, 'Length': np.float64}
+
+# Datasets this process has attached to, keyed by their block names (one attachment per worker)
+_ATTACHED = {}
+_WORKER_DATASET = None
+
+
+class SharedDataset:
+    """
+    Typed, integer-coded columns of the field data in named shared-memory blocks.
+    The parent publishes once; workers attach by name and get NumPy views of the
+    same memory, so only the small handle (block names and category lists) is pickled.
+    """
+
+    def __init__(self, blocks: dict, columns: dict, categories: dict, owner: bool):
+        self._blocks = blocks
+        self.columns = columns
+        self.categories = categories
+        self._owner = owner
+
+    @classmethod
+    def publish(cls, df_input: pd.DataFrame, coded_columns=CODED_COLUMNS, numeric_columns=NUMERIC_COLUMNS) -> "SharedDataset":
+        """Copies the coded columns of a cleaned DataFrame into new shared-memory blocks."""
+        arrays, categories = encode_dataset(df_input, coded_columns, numeric_columns)
+        blocks, columns = {}, {}
+        for name, values in arrays.items():
+            block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            view = np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)
+            view[:] = values
+            blocks[name] = block
+            columns[name] = view
+        return cls(blocks, columns, categories, owner=True)
+
+    @property
+    def handle(self) -> dict:
+        """Picklable description a worker needs to attach: block names, dtypes, length and categories."""
+        return {
+            'blocks': {name: (block.name, self.columns[name].dtype.str) for name, block in self._blocks.items()},
+            'length': len(self),
+            'categories': self.categories,
+        }
+
+    @classmethod
+    def attach(cls, handle: dict) -> "SharedDataset":
+        """Maps the published blocks into this process without copying; cached per process."""
+        key = tuple(name for name, _ in handle['blocks'].values())
+        if key in _ATTACHED:
+            return _ATTACHED[key]
+        blocks, columns = {}, {}
+        for column, (block_name, dtype) in handle['blocks'].items():
+            block = shared_memory.SharedMemory(name=block_name)
+            blocks[column] = block
+            columns[column] = np.ndarray((handle['length'],), dtype=np.dtype(dtype), buffer=block.buf)
+        dataset = cls(blocks, columns, handle['categories'], owner=False)
+        _ATTACHED[key] = dataset
+        return dataset
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.columns[column]
+
+    def decode(self, column: str, codes) -> np.ndarray:
+        """Category labels for integer codes of a coded column."""
+        return np.asarray(self.categories[column], dtype=object)[codes]
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        pandas DataFrame for code that needs one. Coded columns come back as Categoricals and
+        missing integers (-1) as NaN, like load_field_data; float columns are not copied.
+        """
+        data = {name: frame_column(values, self.categories.get(name)) for name, values in self.columns.items()}
+        return pd.DataFrame(data, copy=False)
+
+    def close(self):
+        """Detaches the views; the publishing process also frees the blocks."""
+        self.columns = {}
+        for block in self._blocks.values():
+            block.close()
+            if self._owner:
+                block.unlink()
+        self._blocks = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def encode_dataset(df_input: pd.DataFrame, coded_columns=CODED_COLUMNS, numeric_columns=NUMERIC_COLUMNS):
+    """Fixed-width NumPy columns plus category lists for the cleaned dataset."""
+    arrays, categories = {}, {}
+    for name, dtype in coded_columns.items():
+        codes, labels = encode_column(df_input[name])
+        arrays[name] = codes.astype(dtype)
+        categories[name] = [str(label) for label in labels]
+    for name, dtype in numeric_columns.items():
+        values = pd.to_numeric(df_input[name], errors='coerce')
+        if np.issubdtype(dtype, np.integer):
+            values = values.fillna(-1)
+        arrays[name] = values.to_numpy(dtype=dtype)
+    return arrays, categories
+
+
+def frame_column(values: np.ndarray, categories=None):
+    """Inverse of encode_dataset for one column: Categorical for codes, NaN for the -1 integer fill."""
+    if categories is not None:
+        return pd.Categorical.from_codes(values, categories=categories)
+    if np.issubdtype(values.dtype, np.integer):
+        return np.where(values >= 0, values, np.nan)
+    return values
+
+
+def _attach_worker(handle: dict):
+    global _WORKER_DATASET
+    # Ctrl+C is for the parent, which shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _WORKER_DATASET = SharedDataset.attach(handle)
+
+
+def _call_with_dataset(func, task):
+    return func(_WORKER_DATASET, task)
+
+
+def dataset_pool(dataset: SharedDataset, max_workers=None, mp_context=None) -> ProcessPoolExecutor:
+    """
+    Process pool whose workers attach to the shared blocks once, in their initializer.
+    Pass mp_context=multiprocessing.get_context('spawn') from servers: forked workers would
+    inherit the open client sockets and keep those connections from closing.
+    """
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context,
+                               initializer=_attach_worker, initargs=(dataset.handle,))
+
+
+def submit_with_dataset(pool: ProcessPoolExecutor, func, task) -> Future:
+    """Schedules func(dataset, task) on a dataset_pool; only the task itself is pickled."""
+    return pool.submit(_call_with_dataset, func, task)
+
+
+def run_in_pool(func, tasks, dataset: SharedDataset, max_workers=None) -> list:
+    """
+    Runs func(dataset, task) for every task in a process pool. Each worker attaches to the
+    shared blocks once in its initializer; only the task itself is sent per call.
+    `func` must be a module-level function so it can be pickled.
+    """
+    with dataset_pool(dataset, max_workers) as pool:
+        futures = [submit_with_dataset(pool, func, task) for task in tasks]
+        return [future.result() for future in futures]
+
+
+def mean_parasite_by_year(dataset: SharedDataset, locale: str) -> pd.Series:
+    """Example task: yearly mean Parasite (> 0) for one locale, straight from the shared columns."""
+    locale_code = dataset.categories['Locale'].index(locale)
+    parasite = dataset['Parasite']
+    mask = (dataset['Locale'] == locale_code) & (parasite > 0) & (dataset['Year'] >= 0)
+    years = dataset['Year'][mask]
+    sums = np.bincount(years - years.min(), weights=parasite[mask]) if len(years) else np.empty(0)
+    counts = np.bincount(years - years.min()) if len(years) else np.empty(0)
+    present = counts > 0
+    index = np.arange(len(counts))[present] + (years.min() if len(years) else 0)
+    return pd.Series(sums[present] / counts[present], index=index, name=locale)
+
+
+# --- Main script execution ---
+if __name__ == "__main__":
+    try:
+        df_main = load_field_data(FILE_PATH)
+        print(f"Successfully loaded data from: {FILE_PATH}")
+    except FileNotFoundError:
+        print(f"CRITICAL ERROR: The file '{FILE_PATH}' was not found.")
+        exit()
+
+    with SharedDataset.publish(df_main) as shared:
+        print(f"Published {len(shared)} rows in {len(shared.handle['blocks'])} shared blocks")
+        results = run_in_pool(mean_parasite_by_year, shared.categories['Locale'], shared)
+        print("\n--- Mean Parasite Count per Year (computed in worker processes) ---")
+        print(pd.concat(results, axis=1).round(2))
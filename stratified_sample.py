@@ -0,0 +1,79 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from field_data import FILE_PATH, clean_field_data, iter_field_chunks
+
+# --- Configuration ---
+RESERVOIR_SIZE = 40                     # Rows kept per stratum
+STRATA_KEYS = ['Locale', 'Year', 'Morph']
+CHUNK_SIZE = 100_000
+WEIGHT_COLUMN = 'SamplingWeight'
+
+
+def stratified_reservoir(file_path: str = FILE_PATH, per_stratum: int = RESERVOIR_SIZE, keys=STRATA_KEYS,
+                         chunk_size: int = CHUNK_SIZE, seed: int = 0) -> pd.DataFrame:
+    """
+    One pass over the CSV keeping a uniform random sample of up to `per_stratum` rows for every
+    (Locale, Year, Morph) stratum, including strata with a missing key. Each row gets a random
+    priority and each stratum keeps its lowest priorities (bottom-k reservoir), merged chunk by chunk.
+    Rows come back as read from the file, plus SamplingWeight = rows seen / rows kept in the stratum.
+    """
+    rng = np.random.default_rng(seed)
+    strata_cols = [f"_stratum_{key}" for key in keys]
+    reservoir = None
+    seen = None
+
+    for chunk in iter_field_chunks(file_path, chunk_size):
+        clean = clean_field_data(chunk)
+        for key, col in zip(keys, strata_cols):
+            chunk[col] = clean[key].to_numpy()
+        chunk['_priority'] = rng.random(len(chunk))
+
+        chunk_seen = chunk.groupby(strata_cols, dropna=False).size()
+        seen = chunk_seen if seen is None else seen.add(chunk_seen, fill_value=0)
+
+        combined = chunk if reservoir is None else pd.concat([reservoir, chunk], ignore_index=True)
+        combined = combined.sort_values('_priority', kind='stable')
+        rank = combined.groupby(strata_cols, dropna=False).cumcount()
+        reservoir = combined[rank.to_numpy() < per_stratum]
+
+    if reservoir is None:
+        return pd.DataFrame()
+
+    seen = seen.rename('_seen').reset_index()
+    kept = reservoir.groupby(strata_cols, dropna=False)['_priority'].transform('size')
+    reservoir = reservoir.merge(seen, on=strata_cols, how='left')
+    reservoir[WEIGHT_COLUMN] = reservoir['_seen'].to_numpy() / kept.to_numpy()
+    return reservoir.drop(columns=strata_cols + ['_priority', '_seen']).reset_index(drop=True)
+
+
+def load_preview(file_path: str = FILE_PATH, per_stratum: int = RESERVOIR_SIZE, seed: int = 0) -> pd.DataFrame:
+    """Drop-in replacement for pd.read_csv(file_path) in the plotting scripts' preview mode."""
+    start_time = time.perf_counter()
+    sample = stratified_reservoir(file_path, per_stratum=per_stratum, seed=seed)
+    print(f"PREVIEW: {len(sample)} sampled rows (up to {per_stratum} per Locale/Year/Morph stratum, "
+          f"representing {sample[WEIGHT_COLUMN].sum():.0f} rows) in {time.perf_counter() - start_time:.2f} s")
+    return sample
+
+
+# --- Main script execution ---
+if __name__ == "__main__":
+    try:
+        preview = load_preview(FILE_PATH)
+    except FileNotFoundError:
+        print(f"CRITICAL ERROR: The file '{FILE_PATH}' was not found.")
+        exit()
+
+    clean_preview = clean_field_data(preview)
+    strata = clean_preview.groupby(STRATA_KEYS, dropna=False)[WEIGHT_COLUMN].agg(['size', 'first'])
+    print(f"\n--- {len(strata)} strata in the preview (sampled rows, weight) ---")
+    print(strata.head(20))
+
+    # Weighted means recover the full-data estimate from the sample
+    valid = clean_preview.dropna(subset=['Parasite'])
+    weighted = (valid['Parasite'] * valid[WEIGHT_COLUMN]).groupby(valid['Locale']).sum() / \
+        valid[WEIGHT_COLUMN].groupby(valid['Locale']).sum()
+    print("\n--- Weighted mean Parasite per Locale (from the preview sample) ---")
+    print(weighted.round(3))
@@ -0,0 +1,192 @@
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from scipy.stats import chi2
+
+from field_data import FILE_PATH, load_field_data, encode_column
+
+# Define thorax colors you're interested in (standardized to lowercase)
+EXPECTED_THORAX_COLORS = sorted([
+    'brown', 'blue', 'green', 'blue-green',
+    'turquoise', 'violet-blue', 'violet-green', 'olive'
+])
+SIGNIFICANCE_LEVEL = 0.05
+
+
+def build_thorax_counts(df_input: pd.DataFrame) -> dict:
+    """
+    Builds the Locale x Year x Thor.col, Locale x Thor.col and Morph x Thor.col count tensors in one pass.
+    Each row is turned into a flat cell index from its integer codes and counted with bincount.
+    Rows without a parsable Datum (no Year) are left out of locale_year_color only; locale_color
+    counts them, so its per-locale totals match color_locale.py.
+    """
+    df = df_input.dropna(subset=['Thor.col'])
+
+    locale_codes, locales = encode_column(df['Locale'])
+    year_codes, years = encode_column(df['Year'])
+    morph_codes, morphs = encode_column(df['Morph'])
+
+    # Keep the expected colours as columns even when a site never recorded them
+    colors = np.array(sorted(set(EXPECTED_THORAX_COLORS) | set(df['Thor.col'].unique())))
+    color_codes = np.searchsorted(colors, df['Thor.col'].to_numpy(dtype=str))
+
+    n_loc, n_year, n_morph, n_col = len(locales), len(years), len(morphs), len(colors)
+
+    valid = (locale_codes >= 0) & (year_codes >= 0)
+    flat = (locale_codes[valid] * n_year + year_codes[valid]) * n_col + color_codes[valid]
+    locale_year_color = np.bincount(flat, minlength=n_loc * n_year * n_col).reshape(n_loc, n_year, n_col)
+
+    valid = locale_codes >= 0
+    flat = locale_codes[valid] * n_col + color_codes[valid]
+    locale_color = np.bincount(flat, minlength=n_loc * n_col).reshape(n_loc, n_col)
+
+    valid = morph_codes >= 0
+    flat = morph_codes[valid] * n_col + color_codes[valid]
+    morph_color = np.bincount(flat, minlength=n_morph * n_col).reshape(n_morph, n_col)
+
+    return {
+        'locales': locales,
+        'years': years.astype(int),
+        'morphs': morphs,
+        'colors': colors,
+        'locale_year_color': locale_year_color,
+        'locale_color': locale_color,
+        'morph_color': morph_color,
+    }
+
+
+def normalise_counts(counts: np.ndarray) -> np.ndarray:
+    """Turns counts into probabilities along the colour (last) axis; empty cells stay 0."""
+    totals = counts.sum(axis=-1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        probs = np.where(totals > 0, counts / totals, 0.0)
+    return probs
+
+
+def homogeneity_tests(tables: np.ndarray) -> pd.DataFrame:
+    """
+    Chi-square and G-tests of homogeneity for a stack of contingency tables (K x R x C).
+    Empty rows and columns are ignored, as if they had been dropped from each table.
+    """
+    tables = np.asarray(tables, dtype=float)
+    if tables.ndim == 2:
+        tables = tables[np.newaxis]
+
+    row_tot = tables.sum(axis=2, keepdims=True)
+    col_tot = tables.sum(axis=1, keepdims=True)
+    total = tables.sum(axis=(1, 2), keepdims=True)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        expected = np.where(total > 0, row_tot * col_tot / total, 0.0)
+        chi_terms = np.where(expected > 0, (tables - expected) ** 2 / expected, 0.0)
+        g_terms = np.where(tables > 0, tables * np.log(tables / expected), 0.0)
+
+    chi_stat = chi_terms.sum(axis=(1, 2))
+    g_stat = 2 * g_terms.sum(axis=(1, 2))
+    dof = ((row_tot[:, :, 0] > 0).sum(axis=1) - 1) * ((col_tot[:, 0, :] > 0).sum(axis=1) - 1)
+
+    testable = dof > 0
+    p_chi = np.full(len(tables), np.nan)
+    p_g = np.full(len(tables), np.nan)
+    p_chi[testable] = chi2.sf(chi_stat[testable], dof[testable])
+    p_g[testable] = chi2.sf(g_stat[testable], dof[testable])
+
+    return pd.DataFrame({
+        'n': total.ravel().astype(int),
+        'dof': dof,
+        'chi2': chi_stat,
+        'p_chi2': p_chi,
+        'G': g_stat,
+        'p_G': p_g,
+    })
+
+
+def summarise_thorax_tests(counts: dict) -> dict:
+    """
+    Runs the homogeneity tests for every locale (across years), every year (across locales),
+    and for the overall Locale x Thor.col and Morph x Thor.col tables.
+    """
+    lyc = counts['locale_year_color']
+
+    per_locale = homogeneity_tests(lyc)
+    per_locale.insert(0, 'Locale', counts['locales'])
+
+    per_year = homogeneity_tests(lyc.transpose(1, 0, 2))
+    per_year.insert(0, 'Year', counts['years'])
+
+    overall_locale = homogeneity_tests(counts['locale_color'])
+    overall_morph = homogeneity_tests(counts['morph_color'])
+
+    return {
+        'per_locale': per_locale,
+        'per_year': per_year,
+        'locale_overall': overall_locale.iloc[0],
+        'morph_overall': overall_morph.iloc[0],
+    }
+
+
+def plot_thorax_grid(counts: dict, tests: dict, n_cols: int = 3):
+    """Faceted grid: one panel per locale with stacked colour probabilities per year."""
+    locales = counts['locales']
+    years = counts['years']
+    colors = counts['colors']
+    probs = normalise_counts(counts['locale_year_color'])
+    per_locale = tests['per_locale']
+
+    n_rows = int(np.ceil(len(locales) / n_cols))
+    fig, axes = plt.subplots(n_rows, n_cols, figsize=(5 * n_cols, 3.5 * n_rows), sharex=True, sharey=True, squeeze=False)
+    palette = plt.get_cmap('tab20')(np.linspace(0, 1, len(colors)))
+
+    for i, ax in enumerate(axes.flat):
+        if i >= len(locales):
+            ax.set_visible(False)
+            continue
+        bottom = np.zeros(len(years))
+        for c, color_name in enumerate(colors):
+            ax.bar(years, probs[i, :, c], bottom=bottom, color=palette[c], width=0.9, label=color_name)
+            bottom += probs[i, :, c]
+        p_val = per_locale['p_chi2'].iloc[i]
+        p_text = "p = N/A" if np.isnan(p_val) else f"p = {p_val:.3g}"
+        significant = p_val < SIGNIFICANCE_LEVEL
+        ax.set_title(f"{locales[i]} (n={per_locale['n'].iloc[i]}, {p_text}{' *' if significant else ''})", fontsize=10,
+                     fontweight='bold' if significant else 'normal')
+        ax.grid(axis='y', linestyle='--', alpha=0.5)
+
+    handles, labels = axes.flat[0].get_legend_handles_labels()
+    fig.legend(handles, labels, loc='lower center', ncol=min(len(colors), 8), fontsize=9)
+    fig.supxlabel("Year")
+    fig.supylabel("Thorax Color Probability")
+    fig.suptitle("Thorax Color Probabilities by Locale and Year (chi-square test across years; "
+                 f"* = p < {SIGNIFICANCE_LEVEL})", fontsize=14)
+    fig.tight_layout(rect=(0, 0.06, 1, 0.97))
+    plt.show()
+
+
+# --- Main script execution ---
+if __name__ == "__main__":
+    try:
+        df_main = load_field_data(FILE_PATH)
+        print(f"Successfully loaded data from: {FILE_PATH}")
+    except FileNotFoundError:
+        print(f"CRITICAL ERROR: The file '{FILE_PATH}' was not found.")
+        exit()
+
+    counts = build_thorax_counts(df_main)
+    tests = summarise_thorax_tests(counts)
+
+    print("\n--- Thorax colour homogeneity across years, per locale ---")
+    print(tests['per_locale'].to_string(index=False))
+    print("\n--- Thorax colour homogeneity across locales, per year ---")
+    print(tests['per_year'].to_string(index=False))
+    print(f"\nLocale x Thor.col: chi2 = {tests['locale_overall']['chi2']:.2f}, p = {tests['locale_overall']['p_chi2']:.4e}")
+    print(f"Morph x Thor.col: chi2 = {tests['morph_overall']['chi2']:.2f}, p = {tests['morph_overall']['p_chi2']:.4e}")
+
+    locale_probs = pd.DataFrame(normalise_counts(counts['locale_color']), index=counts['locales'], columns=counts['colors'])
+    print("\n--- Thorax Color Probabilities per Locale (all years) ---")
+    print(locale_probs.round(3))
+
+    morph_probs = pd.DataFrame(normalise_counts(counts['morph_color']), index=counts['morphs'], columns=counts['colors'])
+    print("\n--- Thorax Color Probabilities per Morph ---")
+    print(morph_probs.round(3))
+
+    plot_thorax_grid(counts, tests)
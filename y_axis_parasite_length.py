@@ -20,31 +20,10 @@ print(mean_data[['Parasite', 'Length']])
 
 # Only run correlation if there are enough points
 if len(mean_data) >= 2:
-    r, p = pearsonr(mean_data['Parasite'], mean_data['Length'])
-    print(f"Pearson r = {r:.3f}, p = {p:.3g}")
-    fig, ax1 = plt.subplots(figsize=(10, 6))
-
-    # First y-axis: Parasite
-    color = 'tab:blue'
-    ax1.set_xlabel('Year')
-    ax1.set_ylabel('Parasite (mean)', color=color)
-    ax1.plot(mean_data['Year'], mean_data['Parasite'], marker='o', color=color, label='Parasite')
-    ax1.tick_params(axis='y', labelcolor=color)
-
-    # Second y-axis: Length
-    ax2 = ax1.twinx()
-    color = 'tab:green'
-    ax2.set_ylabel('Length (mean)', color=color)
-    ax2.plot(mean_data['Year'], mean_data['Length'], marker='s', color=color, label='Length')
-    ax2.tick_params(axis='y', labelcolor=color)
-
-    plt.title('Median Parasite Count and Length in Hoje_A_6 (2000–2024)')
-    fig.tight_layout()
-    plt.grid(True)
-
     # Pearson correlation (based on yearly means)
     r, p = pearsonr(mean_data['Parasite'], mean_data['Length'])
     corr_text = f"Pearson r = {r:.3f}, p = {p:.4f}"
+    print(corr_text)
 
     # Plot
     fig, ax1 = plt.subplots(figsize=(10, 6))